@@ -0,0 +1,323 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+This module implements the searchable chat history of the chat server.
+
+Every broadcast message gets a sequence number and is appended to a log
+file. An inverted index maps every word of the messages, and every
+sender as "from:<name>", to the sorted sequence numbers of the messages
+that contain it. The index is kept in memory as arrays of 4 byte
+integers and saved next to the log now and then; on start the snapshot
+is loaded and the messages logged after it are indexed again.
+
+Files in the history directory:
+    messages.log    per message: sender length (H), text length (I),
+                    sender and text in UTF-8
+    index.bin       "CHIX", version (B), messages covered (I), number of
+                    keys (I), then per key: key length (H), key in UTF-8,
+                    number of postings (I) and the postings (I each)
+
+Run it as a script to benchmark indexing and queries.
+"""
+
+import array
+import bisect
+import itertools
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SENDER_PREFIX = "from:"
+MAGIC = b"CHIX"
+VERSION = 1
+
+_RECORD = struct.Struct("<HI")
+_HEADER = struct.Struct("<4sBII")
+_KEY = struct.Struct("<H")
+_COUNT = struct.Struct("<I")
+#typecode of an unsigned 4 byte integer array
+_POSTING_TYPE = "I" if array.array("I").itemsize == 4 else "L"
+
+
+def tokenize(text: str) -> set:
+    """
+    Return the distinct lower case words of a text.
+    """
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def parse_query(query: str) -> list:
+    """
+    Return the index keys of a query: its words plus "from:<name>" for
+    every from:<name> term.
+    """
+    keys = []
+    for term in query.split():
+        if term.lower().startswith(SENDER_PREFIX) and len(term) > len(SENDER_PREFIX):
+            keys.append(SENDER_PREFIX + term[len(SENDER_PREFIX):].lower())
+        else:
+            keys.extend(tokenize(term))
+    return keys
+
+
+class ChatIndex():
+    """
+    This class stores the chat history and answers searches over it.
+    It is shared by all client threads of the server, so every method
+    holds a lock while it uses the index.
+    """
+    def __init__(self, path: str, snapshot_every: int = 100000) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.log_path = os.path.join(path, "messages.log")
+        self.snapshot_path = os.path.join(path, "index.bin")
+        self.snapshot_every = snapshot_every  #messages between snapshots of the index
+        self.lock = threading.Lock()
+
+        self.postings = {}  #word or "from:<sender>" -> sorted array of sequence numbers
+        self.offsets = array.array("Q")  #position of every message in the log, by sequence number
+        self.size = 0  #bytes of complete messages in the log
+        self.snapshot_count = 0  #messages covered by the snapshot on disk
+        self.load()
+
+        self.log = open(self.log_path, "ab")
+        self.reader = open(self.log_path, "rb")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def load(self) -> None:
+        """
+        Load the snapshot, find the messages in the log and index the ones
+        the snapshot does not cover.
+        """
+        covered = self.load_snapshot()
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as file:
+            data = file.read()
+        offset = 0
+        while offset + _RECORD.size <= len(data):
+            sender_length, text_length = _RECORD.unpack_from(data, offset)
+            end = offset + _RECORD.size + sender_length + text_length
+            if end > len(data):
+                break   #the server stopped in the middle of writing this message
+            seq = len(self.offsets)
+            self.offsets.append(offset)
+            if seq >= covered:
+                sender, text = self.decode_record(data[offset:end])
+                self.index_message(seq, sender, text)
+            offset = end
+        if offset < len(data):
+            os.truncate(self.log_path, offset)
+        self.size = offset
+        if len(self.offsets) < covered:
+            #the snapshot is newer than the log, index the log from scratch
+            self.postings = {}
+            self.snapshot_count = 0
+            self.offsets = array.array("Q")
+            os.remove(self.snapshot_path)
+            self.load()
+
+    def load_snapshot(self) -> int:
+        """
+        Load the saved index and return how many messages it covers.
+        """
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return 0
+        magic, version, covered, num_keys = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            return 0
+        offset = _HEADER.size
+        for _ in range(num_keys):
+            (key_length,) = _KEY.unpack_from(data, offset)
+            offset += _KEY.size
+            key = data[offset:offset + key_length].decode("utf-8")
+            offset += key_length
+            (count,) = _COUNT.unpack_from(data, offset)
+            offset += _COUNT.size
+            postings = array.array(_POSTING_TYPE)
+            postings.frombytes(data[offset:offset + 4*count])
+            if sys.byteorder != "little":
+                postings.byteswap()
+            offset += 4*count
+            self.postings[key] = postings
+        self.snapshot_count = covered
+        return covered
+
+    def decode_record(self, record: bytes) -> tuple:
+        """
+        Return (sender, text) of a message record from the log.
+        """
+        sender_length, text_length = _RECORD.unpack_from(record, 0)
+        start = _RECORD.size
+        sender = record[start:start + sender_length].decode("utf-8")
+        text = record[start + sender_length:start + sender_length + text_length].decode("utf-8")
+        return sender, text
+
+    def index_message(self, seq: int, sender: str, text: str) -> None:
+        """
+        Add seq to the posting arrays of the words and the sender of a message.
+        """
+        keys = tokenize(text)
+        keys.add(SENDER_PREFIX + sender.lower())
+        postings = self.postings
+        for key in keys:
+            found = postings.get(key)
+            if found is None:
+                found = postings[key] = array.array(_POSTING_TYPE)
+            found.append(seq)
+
+    def add(self, sender: str, text: str) -> int:
+        """
+        Log and index a broadcast message and return its sequence number.
+        """
+        sender_bytes = sender.encode("utf-8")
+        text_bytes = text.encode("utf-8")
+        record = _RECORD.pack(len(sender_bytes), len(text_bytes)) + sender_bytes + text_bytes
+        with self.lock:
+            seq = len(self.offsets)
+            self.log.write(record)
+            self.log.flush()
+            self.offsets.append(self.size)
+            self.size += len(record)
+            self.index_message(seq, sender, text)
+            if len(self.offsets) - self.snapshot_count >= self.snapshot_every:
+                self.write_snapshot()
+        return seq
+
+    def message(self, seq: int) -> str:
+        """
+        Return message seq as "sender: text".
+        """
+        with self.lock:
+            start = self.offsets[seq]
+            end = self.offsets[seq + 1] if seq + 1 < len(self.offsets) else self.size
+        sender, text = self.decode_record(os.pread(self.reader.fileno(), end - start, start))
+        return f"{sender}: {text}"
+
+    def search(self, query: str, limit: int = 10, before: int = None) -> tuple:
+        """
+        Return (matches, cursor) for the newest messages older than before
+        that contain every word of the query (and come from the senders it
+        names). matches is a list of (seq, message), newest first, and
+        cursor is the before of the next page or None after the last one.
+        """
+        keys = parse_query(query)
+        if not keys:
+            return [], None
+        found = []
+        with self.lock:
+            lists = [self.postings.get(key) for key in keys]
+            if any(postings is None for postings in lists):
+                return [], None
+            #walk the shortest list backwards and look the others up by bisection
+            lists.sort(key=len)
+            shortest, others = lists[0], lists[1:]
+            position = len(shortest) if before is None else bisect.bisect_left(shortest, before)
+            #seq only decreases, so each lookup can skip what lies above the previous one
+            bounds = [len(postings) for postings in others]
+            while position > 0 and len(found) < limit:
+                position -= 1
+                seq = shortest[position]
+                for which, postings in enumerate(others):
+                    bound = bounds[which] = bisect.bisect_left(postings, seq, 0, bounds[which])
+                    if bound == len(postings) or postings[bound] != seq:
+                        break
+                else:
+                    found.append(seq)
+        matches = [(seq, self.message(seq)) for seq in found]
+        cursor = found[-1] if len(found) == limit and position > 0 else None
+        return matches, cursor
+
+    def write_snapshot(self) -> None:
+        """
+        Save the index to the snapshot file; the caller holds the lock.
+        The file is replaced at once so a crash leaves the old one.
+        """
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, len(self.offsets), len(self.postings)))
+            for key, postings in self.postings.items():
+                key_bytes = key.encode("utf-8")
+                file.write(_KEY.pack(len(key_bytes)) + key_bytes + _COUNT.pack(len(postings)))
+                if sys.byteorder != "little":
+                    postings = array.array(_POSTING_TYPE, postings)
+                    postings.byteswap()
+                file.write(postings.tobytes())
+        os.replace(temporary, self.snapshot_path)
+        self.snapshot_count = len(self.offsets)
+
+    def close(self) -> None:
+        """
+        Save the index and close the log.
+        """
+        with self.lock:
+            if len(self.offsets) > self.snapshot_count:
+                self.write_snapshot()
+            self.log.close()
+            self.reader.close()
+
+
+def benchmark(num_messages: int = 1000000, vocabulary: int = 20000, queries: int = 200) -> None:
+    """
+    Index num_messages random messages (words drawn from a Zipf-like
+    vocabulary) and time single word, two word and sender queries.
+    """
+    rng = random.Random(0)
+    words = [f"w{index}" for index in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1/(rank + 1) for rank in range(vocabulary)))
+    senders = [f"Client{index}" for index in range(1, 9)]
+    with tempfile.TemporaryDirectory() as path:
+        index = ChatIndex(path, snapshot_every=num_messages + 1)
+        elapsed = 0
+        for _ in range(num_messages):
+            sender = rng.choice(senders)
+            text = " ".join(rng.choices(words, cum_weights=cum_weights, k=8))
+            begin = time.perf_counter()
+            index.add(sender, text)
+            elapsed += time.perf_counter() - begin
+        print(f"indexed {num_messages} messages in {elapsed:.1f} s "
+              f"({elapsed/num_messages*1e6:.1f} us per message)")
+
+        for name, make_query in (
+                ("common word", lambda: rng.choice(words[:10])),
+                ("rare word", lambda: rng.choice(words[-1000:])),
+                ("two words", lambda: " ".join(rng.choices(words[:200], k=2))),
+                ("word from sender", lambda: f"{rng.choice(words[:50])} from:{rng.choice(senders)}")):
+            times = []
+            for _ in range(queries):
+                query = make_query()
+                start = time.perf_counter()
+                matches, cursor = index.search(query)
+                if cursor is not None:
+                    index.search(query, before=cursor)
+                times.append(time.perf_counter() - start)
+            times.sort()
+            print(f"{name:<18} two pages: p50 {times[len(times)//2]*1e3:.2f} ms, "
+                  f"p99 {times[int(0.99*(len(times) - 1))]*1e3:.2f} ms")
+
+        begin = time.perf_counter()
+        index.close()
+        print(f"snapshot saved in {time.perf_counter() - begin:.2f} s, "
+              f"{os.path.getsize(index.snapshot_path)/2**20:.1f} MiB index, "
+              f"{os.path.getsize(index.log_path)/2**20:.1f} MiB log")
+        begin = time.perf_counter()
+        reloaded = ChatIndex(path)
+        print(f"reloaded {len(reloaded)} messages in {time.perf_counter() - begin:.2f} s")
+        reloaded.close()
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
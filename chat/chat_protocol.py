@@ -0,0 +1,462 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+This module implements the framed protocol shared by the chat server and
+the chat clients.
+
+Every frame is a header (type (B), stream (I), payload length (I), little
+endian) followed by the payload. Chat traffic uses stream 0; every file
+transfer has its own stream id, chosen by the side that sends the file.
+
+    HELLO       client name, the first frame of a client
+    CHAT        a chat message in UTF-8
+    FILE_START  size of the file (Q) and its name in UTF-8
+    FILE_CHUNK  the next bytes of the file
+    FILE_END    the file is complete
+    CREDIT      bytes (I) the receiver of a stream is ready to take more
+    RING        reader slot (I) of a client that reads the broadcasts from
+                the shared memory ring (chat_shm) instead of its socket; the
+                server replies with the sequence number (Q) of the last
+                broadcast that it sent through the socket
+
+The frames travel over TCP or, when server and clients share a machine,
+over a Unix domain socket given by its path, which skips the TCP stack.
+
+A sender may have WINDOW bytes of a stream in flight; the receiver sends
+CREDIT frames as it stores the chunks. Chat and control frames are always
+sent before the next file chunk, and the chunks of several files take
+turns, so a transfer never holds up messages by more than one chunk.
+"""
+
+import os
+import socket
+import stat
+import struct
+import threading
+import time
+from collections import deque
+
+HELLO, CHAT, FILE_START, FILE_CHUNK, FILE_END, CREDIT, RING = 1, 2, 3, 4, 5, 6, 7
+
+CHUNK_SIZE = 32*1024  #largest file chunk in one frame
+WINDOW = 256*1024  #bytes of a stream that may be in flight without credit
+
+_HEADER = struct.Struct("<BII")
+_SIZE = struct.Struct("<Q")
+_CREDIT = struct.Struct("<I")
+
+
+def create_server_socket(host: str, port: int, socket_path: str = None) -> socket.socket:
+    """
+    Return a listening socket: a Unix domain socket at socket_path if it
+    is given, otherwise TCP on host and port.
+    """
+    if socket_path is None:
+        #AF_INET specifies IPv4 and SOCK_STREAM specifies TCP connection-oriented socket
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind((host, port))
+    else:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not available on this platform")
+        #a socket file left behind by a server that did not shut down cleanly is replaced
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.remove(socket_path)
+        server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server_socket.bind(socket_path)
+    server_socket.listen(1000) #the argument 1000 sets the maximum number of queued connections
+    return server_socket
+
+
+def create_client_socket(host: str, port: int, socket_path: str = None) -> socket.socket:
+    """
+    Return a socket connected to the server at socket_path, or at host
+    and port over TCP when no path is given.
+    """
+    if socket_path is None:
+        return socket.create_connection((host, port))
+    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client_socket.connect(socket_path)
+    except OSError:
+        client_socket.close()
+        raise
+    return client_socket
+
+
+def encode_frame(kind: int, stream: int, payload: bytes = b"") -> bytes:
+    """
+    Return a complete frame.
+    """
+    return _HEADER.pack(kind, stream, len(payload)) + payload
+
+
+def recv_exact(sock, size: int) -> bytes:
+    """
+    Receive exactly size bytes, or None if the connection closes first.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def recv_frame(sock) -> tuple:
+    """
+    Receive the next frame as (type, stream, payload), or None if the
+    connection is closed.
+    """
+    header = recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    kind, stream, length = _HEADER.unpack(header)
+    payload = recv_exact(sock, length) if length else b""
+    if payload is None:
+        return None
+    return kind, stream, payload
+
+
+def read_credit(payload: bytes) -> int:
+    """
+    Return the bytes granted by a CREDIT frame.
+    """
+    return _CREDIT.unpack(payload)[0]
+
+
+class OutgoingFile():
+    """
+    This class holds the state of a file being sent on one stream.
+    """
+    def __init__(self, stream: int, path: str, size: int, on_progress=None, on_done=None) -> None:
+        self.stream = stream
+        self.file = open(path, "rb")
+        self.size = size
+        self.sent = 0
+        self.credit = WINDOW
+        self.on_progress = on_progress  #called with (sent, size) after every chunk
+        self.on_done = on_done  #called once the file is sent or the connection is lost
+
+
+class FrameWriter():
+    """
+    This class owns the sending side of a connection. A thread sends the
+    queued chat and control frames first and otherwise the next chunk of
+    the file whose turn it is. Chunks are sent with socket.sendfile, so
+    the data goes from the file to the socket without being copied
+    through Python.
+    """
+    def __init__(self, sock) -> None:
+        self.sock = sock
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            #small chat and credit frames must not wait for earlier data to be acknowledged
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.condition = threading.Condition()
+        self.frames = deque()  #encoded chat and control frames
+        self.files = deque()  #OutgoingFile objects, in the order of their next turn
+        self.next_stream = 1
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send_frame(self, kind: int, stream: int = 0, payload: bytes = b"") -> None:
+        """
+        Queue a chat or control frame.
+        """
+        with self.condition:
+            if not self.closed:
+                self.frames.append(encode_frame(kind, stream, payload))
+                self.condition.notify()
+
+    def send_file(self, path: str, name: str, on_progress=None, on_done=None) -> int:
+        """
+        Queue the file at path to be sent under name and return its stream.
+        If the writer is closed nothing is sent, on_done(False) is called
+        at once and 0 is returned.
+        """
+        size = os.path.getsize(path)
+        with self.condition:
+            closed = self.closed
+            if not closed:
+                stream = self.next_stream
+                self.next_stream += 1
+                outgoing = OutgoingFile(stream, path, size, on_progress, on_done)
+                #the start frame is queued first, so it always goes out before the chunks
+                self.frames.append(encode_frame(FILE_START, stream, _SIZE.pack(size) + name.encode('utf-8')))
+                self.files.append(outgoing)
+                self.condition.notify()
+        if closed:
+            #the connection is gone, so the file is given up like the unfinished ones
+            if on_done is not None:
+                on_done(False)
+            return 0
+        return stream
+
+    def add_credit(self, stream: int, amount: int) -> None:
+        """
+        Let a stream send amount more bytes, after a CREDIT frame.
+        """
+        with self.condition:
+            for outgoing in self.files:
+                if outgoing.stream == stream:
+                    outgoing.credit += amount
+                    self.condition.notify()
+                    break
+
+    def next_file(self) -> OutgoingFile:
+        """
+        Return the next file with credit left, rotating the turns, or None.
+        The caller holds the condition.
+        """
+        for _ in range(len(self.files)):
+            outgoing = self.files[0]
+            self.files.rotate(-1)
+            if outgoing.credit > 0:
+                return outgoing
+        return None
+
+    def run(self) -> None:
+        """
+        Send frames and file chunks until the writer is closed.
+        """
+        try:
+            while True:
+                with self.condition:
+                    outgoing = None
+                    while not self.closed and not self.frames:
+                        outgoing = self.next_file()
+                        if outgoing is not None:
+                            break
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    if outgoing is None:
+                        frame = self.frames.popleft()
+                    else:
+                        count = min(CHUNK_SIZE, outgoing.credit, outgoing.size - outgoing.sent)
+                        outgoing.credit -= count
+
+                if outgoing is None:
+                    self.sock.sendall(frame)
+                    continue
+                self.sock.sendall(_HEADER.pack(FILE_CHUNK, outgoing.stream, count))
+                sent = self.sock.sendfile(outgoing.file, outgoing.sent, count) if count else 0
+                outgoing.sent += sent
+                if sent < count:
+                    #the file got shorter while it was sent; the header promised count
+                    #bytes, so the frames that follow cannot be found anymore
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                    return
+                if outgoing.sent == outgoing.size:
+                    self.sock.sendall(encode_frame(FILE_END, outgoing.stream))
+                    #only this thread gives files up, so the file is still queued
+                    with self.condition:
+                        self.files.remove(outgoing)
+                    self.finish(outgoing)
+                if outgoing.on_progress is not None:
+                    outgoing.on_progress(outgoing.sent, outgoing.size)
+        except OSError:
+            pass    #the connection is lost, the reader side notices it too
+        finally:
+            self.close()
+            self.give_up()
+
+    def finish(self, outgoing: OutgoingFile) -> None:
+        outgoing.file.close()
+        if outgoing.on_done is not None:
+            outgoing.on_done(outgoing.sent == outgoing.size)
+
+    def close(self) -> None:
+        """
+        Stop the writer; files that are not sent completely are given up.
+        When it is called from another thread, the writer thread gives them
+        up after the chunk it may be sending, which still uses the file.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        if threading.current_thread() is not self.thread and self.thread.is_alive():
+            return
+        self.give_up()
+
+    def give_up(self) -> None:
+        """
+        Give up the files that are still queued once the writer is closed.
+        """
+        with self.condition:
+            unfinished = list(self.files)
+            self.files.clear()
+        for outgoing in unfinished:
+            self.finish(outgoing)
+
+
+class IncomingFile():
+    """
+    This class holds the state of a file being received on one stream.
+    """
+    def __init__(self, path: str, name: str, size: int) -> None:
+        self.path = path
+        self.name = name
+        self.size = size
+        self.received = 0
+        self.unacknowledged = 0  #bytes stored since the last CREDIT frame
+        self.file = open(path, "wb")
+
+
+class FileReceiver():
+    """
+    This class stores the files received on a connection in a directory
+    and gives credit back to the sender as the chunks are written.
+    on_progress(incoming) is called after every chunk and on_done(incoming)
+    once a file is complete.
+    """
+    def __init__(self, directory: str, writer: FrameWriter, on_progress=None, on_done=None) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.writer = writer
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.files = {}  #stream -> IncomingFile
+
+    def unique_path(self, name: str) -> str:
+        """
+        Return a path in the directory for name that is not taken yet.
+        Only the last part of name is used, so a sender cannot write
+        outside of the directory.
+        """
+        name = os.path.basename(name.replace("\\", "/")) or "file"
+        base, extension = os.path.splitext(name)
+        path = os.path.join(self.directory, name)
+        copy = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{base} ({copy}){extension}")
+            copy += 1
+        return path
+
+    def handle(self, kind: int, stream: int, payload: bytes) -> None:
+        """
+        Handle a FILE_START, FILE_CHUNK or FILE_END frame. Chunks and ends
+        of streams that were never started are ignored.
+        """
+        if kind == FILE_START:
+            (size,) = _SIZE.unpack_from(payload, 0)
+            name = payload[_SIZE.size:].decode('utf-8')
+            self.files[stream] = IncomingFile(self.unique_path(name), name, size)
+        elif kind == FILE_CHUNK:
+            incoming = self.files.get(stream)
+            if incoming is None:
+                return
+            incoming.file.write(payload)
+            incoming.received += len(payload)
+            incoming.unacknowledged += len(payload)
+            if incoming.unacknowledged >= WINDOW//2:
+                self.writer.send_frame(CREDIT, stream, _CREDIT.pack(incoming.unacknowledged))
+                incoming.unacknowledged = 0
+            if self.on_progress is not None:
+                self.on_progress(incoming)
+        elif kind == FILE_END:
+            incoming = self.files.pop(stream, None)
+            if incoming is None:
+                return
+            incoming.file.close()
+            if self.on_done is not None:
+                self.on_done(incoming)
+
+    def close(self) -> None:
+        """
+        Delete the files that were not received completely.
+        """
+        for incoming in self.files.values():
+            incoming.file.close()
+            os.remove(incoming.path)
+        self.files.clear()
+
+
+def _echo_server(host: str, port: int, socket_path: str, connections: int, ready) -> None:
+    """
+    Benchmark peer: for each of the given number of connections, echo the
+    frames of stream 0, swallow the others and report the CPU time used
+    for the connection once it closes.
+    """
+    server_socket = create_server_socket(host, port, socket_path)
+    ready.send(True)
+    for _ in range(connections):
+        connection, _ = server_socket.accept()
+        if connection.family != getattr(socket, "AF_UNIX", None):
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        start = time.process_time()
+        while True:
+            frame = recv_frame(connection)
+            if frame is None:
+                break
+            if frame[1] == 0:
+                connection.sendall(encode_frame(*frame))
+        ready.send(time.process_time() - start)
+        connection.close()
+    server_socket.close()
+
+
+def benchmark(rounds: int = 20000, messages: int = 200000, size: int = 64) -> None:
+    """
+    Compare TCP on the loopback address with a Unix domain socket: the
+    round trip time of a chat frame to an echo server in another process,
+    and the rate and CPU time (both processes) of a one-way stream of
+    chat frames, each sent with its own sendall as the server does.
+    """
+    import multiprocessing
+    import tempfile
+    payload = b"x"*size
+    echo = encode_frame(CHAT, 0, payload)
+    one_way = encode_frame(CHAT, 1, payload)
+    transports = [("tcp", None)]
+    if hasattr(socket, "AF_UNIX"):
+        transports.append(("unix", os.path.join(tempfile.mkdtemp(), "chat.sock")))
+    port = 65533
+    for name, socket_path in transports:
+        ours, theirs = multiprocessing.Pipe()
+        peer = multiprocessing.Process(target=_echo_server, args=("127.0.0.1", port, socket_path, 2, theirs))
+        peer.start()
+        ours.recv()
+
+        def connect() -> socket.socket:
+            sock = create_client_socket("127.0.0.1", port, socket_path)
+            if socket_path is None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock
+
+        sock = connect()
+        times = []
+        for _ in range(rounds):
+            begin = time.perf_counter()
+            sock.sendall(echo)
+            recv_frame(sock)
+            times.append(time.perf_counter() - begin)
+        sock.close()
+        ours.recv()
+        times.sort()
+
+        sock = connect()
+        cpu = time.process_time()
+        begin = time.perf_counter()
+        for _ in range(messages):
+            sock.sendall(one_way)
+        sock.sendall(echo)
+        recv_frame(sock)    #the echo comes back once the server has read everything
+        elapsed = time.perf_counter() - begin
+        cpu = time.process_time() - cpu
+        sock.close()
+        cpu += ours.recv()
+        peer.join()
+        print(f"{name:<5} round trip p50 {times[len(times)//2]*1e6:5.1f} us, "
+              f"p99 {times[int(0.99*(len(times) - 1))]*1e6:5.1f} us | "
+              f"stream {messages/elapsed:7.0f} messages/s, {cpu/messages*1e6:4.1f} us CPU per message")
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,287 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+This module implements a shared memory transport for broadcasts, for
+clients that part2_main.py starts on the same machine as the server.
+
+The server writes every broadcast once into a ring buffer in shared
+memory and each client reads it at its own position, so the cost of a
+broadcast does not grow with the number of clients. A client that falls
+more than the ring behind notices it (an overrun), is told how many
+messages it missed and carries on from the newest one.
+
+Layout of the shared memory (little endian):
+    0       head: bytes ever written to the ring (Q)
+    8       sequence number of the last record (Q)
+    16      capacity of the ring in bytes (Q)
+    24      number of reader slots (Q)
+    32      per reader slot a waiting flag (B), 16 bytes apart
+    data    the ring; every record is length (I), origin slot (i),
+            sequence number (Q) and the payload. A record that does not
+            fit before the end of the ring is written at its start, after
+            a length of 0xffffffff if there is room for one.
+
+The head is only advanced after a record is complete, and there is one
+writer, so readers never see a partial record. A record is at most a
+quarter of the ring; a reader checks after copying a record that the
+writer has not come round to it. The writer may already be writing past
+the head, by the padding before a wrap plus one record, so a reader keeps
+two records' worth of the ring as a guard band.
+
+Readers wait on a semaphore of their own. Before waiting a reader sets its
+flag and looks at the head once more; the server only releases the
+semaphores of readers with the flag set, so there is no system call per
+message while the readers keep up.
+
+Run it as a script to compare the cost of a broadcast with sockets.
+"""
+
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+_HEAD = struct.Struct("<Q")
+_PUBLISHED = struct.Struct("<QQ")
+_LAYOUT = struct.Struct("<QQQQ")
+_RECORD = struct.Struct("<IiQ")
+SLOT_SIZE = 16
+PADDING = 0xffffffff
+NO_ORIGIN = -1  #origin of broadcasts that did not come from a ring reader
+
+
+def _data_start(readers: int) -> int:
+    #the ring starts on a 64 byte boundary after the reader slots
+    return (_LAYOUT.size + readers*SLOT_SIZE + 63)//64*64
+
+
+def _max_record(capacity: int) -> int:
+    #records longer than this go to the clients through their sockets instead
+    return capacity//4
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    #the processes started by part2_main.py share its resource tracker, which
+    #keeps the shared memory until the launcher unlinks it
+    return shared_memory.SharedMemory(name=name)
+
+
+class BroadcastRing():
+    """
+    This class is the writing side of the ring, used by the server. It is
+    created by the launcher, which also creates one semaphore per reader
+    slot and unlinks the shared memory at the end.
+    """
+    def __init__(self, memory: shared_memory.SharedMemory, semaphores: list) -> None:
+        self.memory = memory
+        self.buffer = memory.buf
+        self.head, self.seq, self.capacity, readers = _LAYOUT.unpack_from(self.buffer, 0)
+        self.readers = readers
+        self.data = _data_start(readers)
+        self.flags_end = _LAYOUT.size + readers*SLOT_SIZE
+        self.max_record = _max_record(self.capacity)
+        self.semaphores = semaphores
+        self.lock = threading.Lock()    #the server broadcasts from several threads
+
+    @classmethod
+    def create(cls, capacity: int = 1 << 20, readers: int = 8, semaphores: list = None) -> "BroadcastRing":
+        """
+        Create the shared memory for a ring of capacity bytes with the
+        given number of reader slots.
+        """
+        memory = shared_memory.SharedMemory(create=True, size=_data_start(readers) + capacity)
+        memory.buf[:_data_start(readers)] = bytes(_data_start(readers))
+        _LAYOUT.pack_into(memory.buf, 0, 0, 0, capacity, readers)
+        return cls(memory, semaphores or [])
+
+    @classmethod
+    def attach(cls, name: str, semaphores: list) -> "BroadcastRing":
+        return cls(_attach(name), semaphores)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def publish(self, origin: int, payload: bytes) -> bool:
+        """
+        Write one broadcast and wake the readers that are waiting. It
+        returns False if the payload is too long for the ring.
+        """
+        size = _RECORD.size + len(payload)
+        if size > self.max_record:
+            return False
+        buffer, capacity, data = self.buffer, self.capacity, self.data
+        with self.lock:
+            head = self.head
+            offset = head % capacity
+            if capacity - offset < size:
+                #no room before the end of the ring, continue at its start
+                if capacity - offset >= 4:
+                    struct.pack_into("<I", buffer, data + offset, PADDING)
+                head += capacity - offset
+                offset = 0
+            self.seq += 1
+            _RECORD.pack_into(buffer, data + offset, len(payload), origin, self.seq)
+            buffer[data + offset + _RECORD.size:data + offset + size] = payload
+            #publishing the new head makes the record visible to the readers
+            self.head = head + size
+            _PUBLISHED.pack_into(buffer, 0, self.head, self.seq)
+            #one slice looks at every flag; usually no reader is waiting
+            if any(buffer[_LAYOUT.size:self.flags_end:SLOT_SIZE]):
+                for slot in range(self.readers):
+                    flag = _LAYOUT.size + slot*SLOT_SIZE
+                    if buffer[flag]:
+                        buffer[flag] = 0
+                        if slot < len(self.semaphores):
+                            self.semaphores[slot].release()
+        return True
+
+    def close(self) -> None:
+        self.buffer = None
+        self.memory.close()
+
+    def unlink(self) -> None:
+        self.memory.unlink()
+
+
+class RingReader():
+    """
+    This class reads the ring in a client, in one reader slot, starting
+    with the broadcasts published after it attached.
+    """
+    def __init__(self, name: str, slot: int, semaphore) -> None:
+        self.memory = _attach(name)
+        self.buffer = self.memory.buf
+        self.position, self.last_seq, self.capacity, readers = _LAYOUT.unpack_from(self.buffer, 0)
+        if not 0 <= slot < readers:
+            raise ValueError(f"the ring has no reader slot {slot}")
+        self.slot = slot
+        self.flag = _LAYOUT.size + slot*SLOT_SIZE
+        self.data = _data_start(readers)
+        #the oldest data is safe to read while the head is at most this far ahead,
+        #allowing for the padding and the record the server may be writing
+        self.safe_distance = self.capacity - 2*_max_record(self.capacity)
+        self.semaphore = semaphore
+        self.after = 0  #records up to this sequence number are skipped
+
+    def head(self) -> int:
+        return _HEAD.unpack_from(self.buffer, 0)[0]
+
+    def wait(self, timeout: float) -> None:
+        """
+        Sleep until the server publishes something or timeout passes.
+        """
+        self.buffer[self.flag] = 1
+        #look once more, the server may have published before it saw the flag
+        if self.head() == self.position:
+            self.semaphore.acquire(timeout=timeout)
+        self.buffer[self.flag] = 0
+
+    def start_after(self, seq: int) -> None:
+        """
+        Skip the records up to seq, which the client got some other way.
+        """
+        self.after = seq
+
+    def skip_to_head(self) -> int:
+        """
+        Continue after an overrun from the newest record and return how
+        many messages were skipped.
+        """
+        while True:
+            head, seq = _PUBLISHED.unpack_from(self.buffer, 0)
+            if _PUBLISHED.unpack_from(self.buffer, 0) == (head, seq):
+                break   #the server did not publish between the two reads
+        missed = seq - max(self.last_seq, self.after)
+        self.position, self.last_seq = head, seq
+        return missed
+
+    def read(self, timeout: float = 0.1) -> tuple:
+        """
+        Return (records, missed): the new records as (seq, origin, payload)
+        and the number of messages lost to overruns. It waits up to
+        timeout for a record when there is none.
+        """
+        if self.head() == self.position:
+            self.wait(timeout)
+        records = []
+        missed = 0
+        buffer, capacity, data = self.buffer, self.capacity, self.data
+        head = self.head()
+        while self.position < head:
+            if head - self.position > self.safe_distance:
+                #the server is writing over what this reader has not read yet
+                missed += self.skip_to_head()
+                break
+            offset = self.position % capacity
+            if capacity - offset < 4 or struct.unpack_from("<I", buffer, data + offset)[0] == PADDING:
+                self.position += capacity - offset
+                continue
+            length, origin, seq = _RECORD.unpack_from(buffer, data + offset)
+            start = data + offset + _RECORD.size
+            payload = bytes(buffer[start:start + length])
+            #the copy is only good if the server has not come round to it meanwhile
+            head = self.head()
+            if head - self.position > self.safe_distance:
+                continue
+            self.last_seq = seq
+            self.position += _RECORD.size + length
+            if seq > self.after:
+                records.append((seq, origin, payload))
+        return records, missed
+
+    def close(self) -> None:
+        self.buffer = None
+        self.memory.close()
+
+
+def benchmark(messages: int = 20000, size: int = 64) -> None:
+    """
+    Time one broadcast of a chat message to n clients: one ring publish
+    against n socket sends (what the server does per client otherwise).
+    """
+    import socket
+    from chat_protocol import CHAT, encode_frame
+    payload = b"x"*size
+    frame = encode_frame(CHAT, 0, payload)
+    print(f"cost of one broadcast of a {size} byte message, in microseconds")
+    for readers in (1, 4, 16, 64):
+        ring = BroadcastRing.create(1 << 22, readers)
+        try:
+            begin = time.perf_counter()
+            for _ in range(messages):
+                ring.publish(NO_ORIGIN, payload)
+            ring_time = (time.perf_counter() - begin)/messages
+        finally:
+            ring.close()
+            ring.unlink()
+
+        pairs = [socket.socketpair() for _ in range(readers)]
+        drained = threading.Event()
+
+        def drain() -> None:
+            #keep the receive buffers empty so sendall never blocks
+            while not drained.is_set():
+                for _, receiver in pairs:
+                    try:
+                        receiver.recv(1 << 20, socket.MSG_DONTWAIT)
+                    except BlockingIOError:
+                        pass
+        thread = threading.Thread(target=drain, daemon=True)
+        thread.start()
+        begin = time.perf_counter()
+        for _ in range(messages//10):
+            for sender, _ in pairs:
+                sender.sendall(frame)
+        socket_time = (time.perf_counter() - begin)/(messages//10)
+        drained.set()
+        thread.join()
+        for sender, receiver in pairs:
+            sender.close()
+            receiver.close()
+        print(f"{readers:3d} clients: ring {ring_time*1e6:6.2f}   sockets {socket_time*1e6:7.2f}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -2,33 +2,50 @@
 # Student Names: Weifeng Ke & Peter Kim
 
 from tkinter import *
-import socket
+from tkinter import filedialog
+import os
+import struct
+import sys
 import threading
 from multiprocessing import current_process
 
+from chat_protocol import (HELLO, CHAT, FILE_START, FILE_CHUNK, FILE_END, CREDIT, RING,
+                           FrameWriter, FileReceiver, recv_frame, read_credit, create_client_socket)
+from chat_shm import RingReader
+
 class ChatClient():
     """
     This class implements the chat client.
     It uses the socket module to create a TCP socket and to connect to the server.
     It uses the tkinter module to create the GUI for the chat client.
+    Files can be shared with the other clients; received files are saved
+    in downloads/<client name>.
+    Given a shared memory ring (chat_shm) as (name, slot, semaphore), the
+    broadcasts are read from the ring instead of the socket.
     """
-    def __init__(self, window: Tk) -> None:
+    def __init__(self, window: Tk, socket_path: str = None, ring: tuple = None) -> None:
         #store the main window reference for GUI management and set the window title and initial size
         self.window = window
         self.client_name = current_process().name   #generate client name using the current process name
         self.window.title(f"Chat Client - {self.client_name}")
         self.window.geometry("400x400")
 
-        #create a TCP socket for network communication
-        #AF_INET specifies IPv4 and SOCK_STREAM specifies TCP connection-oriented socket
-        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.host = '127.0.0.1'
         self.port = 65535
+        #with socket_path the server is reached through a Unix domain socket at that path instead of TCP
+        self.socket_path = socket_path
 
         #connect to server
         try:
-            self.client_socket.connect((self.host, self.port))  #establish connection to the server using host and port
-            self.client_socket.send(self.client_name.encode('utf-8')) #send the client name to the server for identification
+            self.client_socket = create_client_socket(self.host, self.port, socket_path)  #establish connection to the server
+            self.writer = FrameWriter(self.client_socket)   #sends messages and files from its own thread
+            self.writer.send_frame(HELLO, 0, self.client_name.encode('utf-8')) #send the client name to the server for identification
+            self.ring_reader = None
+            if ring is not None:
+                #attach before telling the server, so no broadcast falls between socket and ring
+                name, slot, semaphore = ring
+                self.ring_reader = RingReader(name, slot, semaphore)
+                self.writer.send_frame(RING, 0, struct.pack("<I", slot))
         
         except Exception as e:  # handle connection failures
             print(f"Could not connect to server: {e}")
@@ -49,6 +66,20 @@ class ChatClient():
         self.message_entry.pack(side=RIGHT, expand=True, fill=X, padx=(0,10))
         self.message_entry.bind('<Return>', lambda event: self.send_message()) #bind the Enter key to send message function. Allows sending message by pressing Enter
 
+        #create a frame for sharing files and showing the progress of transfers
+        self.file_frame = Frame(window)
+        self.file_frame.pack(padx=10, pady=5, fill=X)
+        Button(self.file_frame, text="Send File...", command=self.choose_file).pack(side=LEFT)
+        self.progress_label = Label(self.file_frame, text="", font=("Arial", 10), anchor="w")
+        self.progress_label.pack(side=LEFT, padx=10, fill=X, expand=True)
+        self.transfers = {}     #maps "sending/receiving <name>" to the percentage done
+
+        #received files are written here as the chunks arrive
+        self.receiver = FileReceiver(os.path.join("downloads", self.client_name), self.writer,
+                                     on_progress=lambda incoming: self.show_progress(
+                                         f"receiving {incoming.name}", incoming.received, incoming.size),
+                                     on_done=self.file_received)
+
         #create a frame for chat history
         Label(window, text="Chat History:", font=("Arial", 12)).pack(anchor="w", padx=10, pady=(1, 1))
         self.chat_box = Text(window, height=20, width=50, wrap=WORD)    #wrap=WORD ensures text wraps at word boundaries
@@ -87,7 +118,7 @@ class ChatClient():
 
         if message:
             try:
-                self.client_socket.send(message.encode('utf-8')) #encode and send message to server
+                self.writer.send_frame(CHAT, 0, message.encode('utf-8')) #encode and queue message for the server
                 self.display_message(f"{self.client_name}: {message}", "right") #display sent message on the right side of chat box
                 self.message_entry.delete(0, END) #clear the message entry after sending
 
@@ -95,6 +126,42 @@ class ChatClient():
                 self.display_message(f"Error sending message: {e}", "center") #display any sending errors
                 self.close_connection() #close connection if send fails
 
+    def choose_file(self) -> None:
+        """
+        Ask for a file and share it with the other clients.
+        """
+        path = filedialog.askopenfilename(title="Send File")
+        if path:
+            self.send_file(path)
+
+    def send_file(self, path: str) -> None:
+        """
+        Queue a file for the server; chat messages keep going out while it is sent.
+        """
+        name = os.path.basename(path)
+        self.writer.send_file(path, name,
+                              on_progress=lambda sent, size: self.show_progress(f"sending {name}", sent, size))
+        self.display_message(f"Sending {name}", "right")
+
+    def file_received(self, incoming) -> None:
+        """
+        Announce a file that has been received completely.
+        """
+        self.display_message(f"Received {incoming.name}, saved as {incoming.path}", "center")
+
+    def show_progress(self, transfer: str, done: int, size: int) -> None:
+        """
+        Show the percentage of every running transfer next to the Send File button.
+        """
+        percent = 100*done//size if size else 100
+        if self.transfers.get(transfer) == percent:
+            return  #only redraw when a percentage changes
+        if percent >= 100:
+            self.transfers.pop(transfer, None)
+        else:
+            self.transfers[transfer] = percent
+        self.progress_label.config(text="  ".join(f"{name} {value}%" for name, value in self.transfers.items()))
+
     def receive_messages(self) -> None:
         """
         Continuously receive messages from the server.
@@ -102,13 +169,23 @@ class ChatClient():
         """
         while True:
             try:
-                message = self.client_socket.recv(1024).decode('utf-8') #receive message from server
+                frame = recv_frame(self.client_socket) #receive the next frame from the server
 
-                #check if the message is empty (indicates disconnection)
-                if not message:
+                #check if the connection is closed
+                if frame is None:
                     break
-                
-                self.display_message(message) #display received messages on left side
+
+                kind, stream, payload = frame
+                if kind == CHAT:
+                    self.display_message(payload.decode('utf-8')) #display received messages on left side
+                elif kind == CREDIT:
+                    self.writer.add_credit(stream, read_credit(payload))
+                elif kind == RING and self.ring_reader is not None:
+                    #the server switched this client to the ring after the broadcast given in the reply
+                    self.ring_reader.start_after(struct.unpack("<Q", payload)[0])
+                    threading.Thread(target=self.read_ring, daemon=True).start()
+                elif kind in (FILE_START, FILE_CHUNK, FILE_END):
+                    self.receiver.handle(kind, stream, payload)
 
             except Exception as e:
                 self.display_message(f"Error receiving message: {e}", "center") #display any receving errors
@@ -117,11 +194,30 @@ class ChatClient():
         # Close connection if receive thread exits
         self.close_connection()
 
+    def read_ring(self) -> None:
+        """
+        Continuously read the broadcasts from the shared memory ring.
+        Runs in a separate thread, like receive_messages.
+        """
+        reader = self.ring_reader
+        while self.ring_reader is not None:
+            records, missed = reader.read()
+            if missed:
+                #this client fell more than the ring behind the server
+                self.display_message(f"missed {missed} messages", "center")
+            for seq, origin, payload in records:
+                if origin != reader.slot:  #skip this client's own messages
+                    self.display_message(payload.decode('utf-8'))
+        reader.close()
+
     def close_connection(self) -> None:
         """
         Close socket connection and quit the window
         Handles cleanup when connection is lost or manually closed
         """
+        self.writer.close()
+        self.receiver.close()   #drop files that were cut off
+        self.ring_reader = None     #stops read_ring, which closes the reader
         try:
             self.client_socket.close() #attempt to close the socket
         except:
@@ -129,13 +225,14 @@ class ChatClient():
 
         self.window.quit()  #close the program window
 
-def main() -> None:
+def main(socket_path: str = None, ring: tuple = None) -> None:
     #set up Tk object
     window = Tk()
     #initialize a chat client object pass window in to interact with TKinter
-    ChatClient(window)
+    ChatClient(window, socket_path, ring)
     #start the whole process 
     window.mainloop()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    #an optional argument is the path of a Unix domain socket to use instead of TCP
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
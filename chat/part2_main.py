@@ -2,17 +2,41 @@
 # Student Names: Weifeng Ke & Peter Kim
 
 from tkinter import *
+import argparse
 import multiprocessing
 import time
 
+from chat_shm import BroadcastRing
+
 import part2_client 
 import part2_server 
 
 if __name__ == "__main__":
-    server = multiprocessing.Process(target=part2_server.main)
+    #the server and the clients run on this machine, so they can skip TCP and use a Unix domain socket
+    parser = argparse.ArgumentParser(description="Chat server and clients")
+    parser.add_argument("--unix", metavar="PATH", help="connect through a Unix domain socket at PATH instead of TCP")
+    parser.add_argument("--shm", action="store_true", help="send the broadcasts to the clients through shared memory")
+    args = parser.parse_args()
+
+    numberOfClients = 2  #Change this value for a different number of clients
+
+    #the ring has a reader slot and a semaphore to wake it for every client
+    ring = None
+    if args.shm:
+        semaphores = [multiprocessing.Semaphore(0) for _ in range(numberOfClients)]
+        ring = BroadcastRing.create(readers=numberOfClients)
+
+    server = multiprocessing.Process(target=part2_server.main,
+                                     args=(args.unix,) + ((ring.name, semaphores) if ring else ()))
     server.start()
     time.sleep(1)  #to ensure server is up and running; may be commented out or changed
 
-    numberOfClients = 2  #Change this value for a different number of clients
     for count in range(1, numberOfClients+1):
-        multiprocessing.Process(target=part2_client.main, name=f"Client{count}").start()
\ No newline at end of file
+        ringArgs = ((ring.name, count - 1, semaphores[count - 1]),) if ring else ()
+        multiprocessing.Process(target=part2_client.main, args=(args.unix,) + ringArgs, name=f"Client{count}").start()
+
+    if ring is not None:
+        #the shared memory is removed once the server window is closed
+        server.join()
+        ring.close()
+        ring.unlink()
\ No newline at end of file
@@ -2,9 +2,17 @@
 # Student Names: Weifeng Ke & Peter Kim
 
 from tkinter import *
+import os
 import socket
+import struct
+import sys
 import threading
 
+from chat_index import ChatIndex
+from chat_protocol import (HELLO, CHAT, FILE_START, FILE_CHUNK, FILE_END, CREDIT, RING,
+                           FrameWriter, FileReceiver, recv_frame, read_credit, create_server_socket)
+from chat_shm import BroadcastRing, NO_ORIGIN
+
 class ChatServer():
     """
     This class implements the chat server.
@@ -13,27 +21,43 @@ class ChatServer():
     the server receives a message, it displays it in its own GUI and also sends 
     the message to the other client.  
     It uses the tkinter module to create the GUI for the server client.
+    Broadcast messages are also kept in a searchable history (chat_index),
+    which clients query with the /search and /more commands.
+    Messages and files travel as frames (chat_protocol). A shared file is
+    stored in a spool file first and then sent from there to every other
+    client, each at its own pace.
+    With a shared memory ring (chat_shm) every broadcast is written once
+    into the ring for the clients that read it there, and sent through
+    the sockets of the others only.
     """
-    def __init__(self, window:Tk) -> None:
+    def __init__(self, window:Tk, history_path: str = "chat_history", socket_path: str = None,
+                 ring: BroadcastRing = None) -> None:
         #store the main window reference for GUI management and set the window title and initial size
         self.window = window
         self.window.title("Chat Server")
         self.window.geometry("400x400")
 
-        #create a TCP socket for network communication
-        #AF_INET specifies IPv4 and SOCK_STREAM specifies TCP connection-oriented socket
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
         #set local host IP.
         #127.0.0.1 is the loopback address (localhost)
         self.host = '127.0.0.1'
         self.port = 65535
-        self.server_socket.bind((self.host, self.port)) # Bind the socket to the specific host and port. This prepares the socket to accept incoming connections
-        self.server_socket.listen(1000) # The argument 1000 sets the maximum number of queued connections
+        #with socket_path the clients connect through a Unix domain socket at that path instead of TCP
+        self.socket_path = socket_path
+        self.server_socket = create_server_socket(self.host, self.port, socket_path) #bind and listen for incoming connections
 
         #initialize lists to track connected clients
         self.clients = []   #stores the actual socket connections
         self.client_names = {}  #maps sockets to their respective usernames
+        self.writers = {}   #maps sockets to the FrameWriter that sends to them
+        self.ring = ring    #shared memory ring for the broadcasts, or None
+        self.ring_clients = {}  #maps sockets of clients that read the ring to their reader slot
+        self.ring_lock = threading.Lock()   #a client switches to the ring between two broadcasts
+
+        #searchable history of the broadcast messages
+        self.chat_index = ChatIndex(history_path)
+        self.search_cursors = {}    #maps sockets to (query, cursor) of their last search
+        #shared files are kept here until every recipient has them
+        self.spool_path = os.path.join(history_path, "spool")
 
         #GUI Setup
         #add titles as per project specification
@@ -72,22 +96,46 @@ class ChatServer():
         """
         Handle individual client communication.
         """
+        writer = FrameWriter(client_socket) #sends messages and files to this client from its own thread
+        receiver = FileReceiver(self.spool_path, writer,
+                                on_done=lambda incoming: self.share_file(incoming, client_socket))
         try:
             #receive the client's username 
-            client_name = client_socket.recv(1024).decode('utf-8') #decode converts the received bytes to a string (1024 is the maximum number of bytes to receive)
+            frame = recv_frame(client_socket)
+            if frame is None or frame[0] != HELLO:
+                return
+            client_name = frame[2].decode('utf-8')
             self.client_names[client_socket] = client_name  #store the client's name associated with their socket
+            self.writers[client_socket] = writer
             self.update_display(f"{client_name} has joined the chat") #announce the new client's arrival to the server's chat display
 
             while True:
-                #continuously receive messages from the client
-                message = client_socket.recv(1024).decode('utf-8') 
-                
-                #check if the message is empty (indicates disconnection)
-                if not message:
+                #continuously receive frames from the client
+                frame = recv_frame(client_socket)
+
+                #check if the connection is closed
+                if frame is None:
                     break
 
-                #broadcast the received message to all other connected clients
-                self.broadcast(message, client_socket)
+                kind, stream, payload = frame
+                if kind == CHAT:
+                    message = payload.decode('utf-8')
+                    #search commands are answered to this client only and are not broadcast
+                    if message.startswith("/search ") or message.strip() == "/more":
+                        self.search(message, client_socket)
+                    else:
+                        #broadcast the received message to all other connected clients
+                        self.broadcast(message, client_socket)
+                elif kind == CREDIT:
+                    writer.add_credit(stream, read_credit(payload))
+                elif kind == RING and self.ring is not None:
+                    #from now on this client reads the broadcasts from the ring; the reply
+                    #tells it the last one it was sent through the socket
+                    with self.ring_lock:
+                        self.ring_clients[client_socket] = struct.unpack("<I", payload)[0]
+                        writer.send_frame(RING, 0, struct.pack("<Q", self.ring.seq))
+                elif kind in (FILE_START, FILE_CHUNK, FILE_END):
+                    receiver.handle(kind, stream, payload)
 
         except Exception:
             #silently handle any communication errors
@@ -97,6 +145,11 @@ class ChatServer():
             #cleanup procedures when a client disconnects
             if client_socket in self.clients:
                 self.clients.remove(client_socket)
+            self.search_cursors.pop(client_socket, None)
+            self.writers.pop(client_socket, None)
+            self.ring_clients.pop(client_socket, None)
+            writer.close()
+            receiver.close()    #drop an upload that was cut off
 
             client_name = self.client_names.get(client_socket, "Unknown")   #retrieve the client's name (default to "Unknown" if not found)
             self.update_display(f"{client_name} has left the chat") #announce the client's departure
@@ -109,15 +162,80 @@ class ChatServer():
         sender_name = self.client_names.get(sender_socket, "Unknown")   #retrieve the sender's name (default to "Unknown" if not found)
         full_message = f"{sender_name}: {message}"  #combine the sender's name with their message
         self.update_display(full_message)   #update the server's chat display with the full message
+        self.chat_index.add(sender_name, message)   #add the message to the searchable history
+
+        frame = full_message.encode('utf-8')
+        with self.ring_lock:
+            #write the message once for the clients that read the ring; they skip their own messages
+            in_ring = self.ring is not None and self.ring.publish(self.ring_clients.get(sender_socket, NO_ORIGIN), frame)
+
+            #queue the message for all other connected clients except the sender; it goes ahead of any file chunks
+            for client in list(self.clients):
+                writer = self.writers.get(client)
+                if client != sender_socket and writer is not None and not (in_ring and client in self.ring_clients):
+                    writer.send_frame(CHAT, 0, frame)
+
+    def share_file(self, incoming, sender_socket: socket) -> None:
+        """
+        Send a file uploaded to the spool to all clients except the sender,
+        and delete the spool file once every one of them has it.
+        """
+        sender_name = self.client_names.get(sender_socket, "Unknown")
+        self.update_display(f"{sender_name} shared {incoming.name} ({incoming.size} bytes)")
+        recipients = [writer for client, writer in list(self.writers.items()) if client != sender_socket]
+        if not recipients:
+            os.remove(incoming.path)
+            return
+
+        remaining = [len(recipients)]   #recipients that are still being sent the file
+        lock = threading.Lock()
+
+        def sent(complete: bool) -> None:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                os.remove(incoming.path)
 
-        #send the message to all connected clients except the sender
-        for client in self.clients:
-            if client != sender_socket:
-                try:
-                    client.send(full_message.encode('utf-8'))   #encode the message to bytes and send it to the client
+        notice = f"{sender_name} is sending you {incoming.name}".encode('utf-8')
+        for writer in recipients:
+            writer.send_frame(CHAT, 0, notice)
+            writer.send_file(incoming.path, incoming.name, on_done=sent)
 
-                except:
-                    self.clients.remove(client) #remove client if unable to send
+    def search(self, command: str, client_socket: socket) -> None:
+        """
+        Answer "/search <words> [from:<name>]" with the newest matching
+        messages, and "/more" with the next page of the last search.
+        """
+        page_size = 10
+        if command.strip() == "/more":
+            query, cursor = self.search_cursors.get(client_socket, (None, None))
+            if cursor is None:
+                self.reply(client_socket, "[search] no more matches")
+                return
+        else:
+            query, cursor = command[len("/search "):].strip(), None
+
+        matches, cursor = self.chat_index.search(query, page_size, cursor)
+        lines = []
+        for seq, message in matches:
+            if len(message) > 80:
+                message = message[:77] + "..."  #long messages are shortened to keep the reply small
+            lines.append(f"#{seq} {message}")
+        if not matches:
+            header = f"[search] {query[:60]!r}: no matches"
+        else:
+            header = f"[search] {query[:60]!r}: {'more with /more' if cursor is not None else 'end of matches'}"
+        self.search_cursors[client_socket] = (query, cursor)
+        self.reply(client_socket, "\n".join([header] + lines))
+
+    def reply(self, client_socket: socket, message: str) -> None:
+        """
+        Send a message to one client only.
+        """
+        writer = self.writers.get(client_socket)
+        if writer is not None:
+            writer.send_frame(CHAT, 0, message.encode('utf-8'))
 
     def update_display(self, message: str) -> None:
         """
@@ -128,12 +246,20 @@ class ChatServer():
         self.chat_display.config(state=DISABLED)    #disable the text widget to prevent user editing
         self.chat_display.see(END)  #scroll to the bottom to show the most recent message
 
-def main():
+def main(socket_path: str = None, ring_name: str = None, semaphores: list = None):
     #create a TKinter object
     window = Tk()
+    #attach to the shared memory ring that part2_main.py created, if any
+    ring = BroadcastRing.attach(ring_name, semaphores) if ring_name is not None else None
     #crate a ChatServer object
-    ChatServer(window)
+    server = ChatServer(window, socket_path=socket_path, ring=ring)
     window.mainloop()
+    server.chat_index.close()   #save the search index for the next start
+    if ring is not None:
+        ring.close()
+    if socket_path is not None:
+        os.remove(socket_path)  #remove the socket file so the path can be used again
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    #an optional argument is the path of a Unix domain socket to use instead of TCP
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
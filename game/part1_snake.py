@@ -6,10 +6,21 @@
     game (https://en.wikipedia.org/wiki/Snake_(video_game_genre))
 """
 
+import argparse
+import os
 import threading
 import queue        #the thread-safe queue from Python standard library
 from tkinter import Tk, Canvas, Button
-import random, time
+import time
+from collections import deque
+
+from snake_engine import SnakeEngine, GameConfig, ATE, GAME_OVER, CHUNK_CELLS
+from snake_replay import ReplayRecorder, ReplayPlayer
+from snake_autopilot import Autopilot, STRATEGIES
+from snake_net import MatchClient
+from snake_profile import TickProfiler
+from snake_world import Camera, worldConfig
+from snake_arena import newArena
 
 class Gui():
     """
@@ -32,17 +43,27 @@ class Gui():
             height = WINDOW_HEIGHT, bg = BACKGROUND_COLOUR)
         self.canvas.pack()
         #create starting game icons for snake and the prey
-        self.snakeIcon = self.canvas.create_line(
-            (0, 0), (0, 0), fill=ICON_COLOUR, width=SNAKE_ICON_WIDTH)
+        self.snakeIcon = SegmentRenderer(self.canvas, SNAKE_ICON_WIDTH, ICON_COLOUR)
         self.preyIcon = self.canvas.create_rectangle(
             0, 0, 0, 0, fill=ICON_COLOUR, outline=ICON_COLOUR)
         #display starting score of 0
         self.score = self.canvas.create_text(
             scoreTextXLocation, scoreTextYLocation, fill=textColour, 
             text='Your Score: 0', font=("Helvetica","11","bold"))
+        #snakes of a network match or an arena, by player id
+        self.matchSnakeIcons = {}
+        #the many prey of an arena
+        self.preyIcons = SegmentRenderer(self.canvas, PREY_ICON_WIDTH, ICON_COLOUR)
+        #performance HUD in the bottom right corner, toggled with F3
+        self.hud = self.canvas.create_text(
+            WINDOW_WIDTH - 5, WINDOW_HEIGHT - 5, anchor="se", fill=textColour,
+            font=("Courier", "9"), state="hidden")
+        self.hudVisible = False
+        self.hudJob = None
         #binding the arrow keys to be able to control the snake
         for key in ("Left", "Right", "Up", "Down"):
             self.root.bind(f"<Key-{key}>", game.whenAnArrowKeyIsPressed)
+        self.root.bind("<Key-F3>", self.toggleHud)
 
     def gameOver(self) -> None:
         """
@@ -53,15 +74,105 @@ class Gui():
             height = 3, width = 10, font=("Helvetica","14","bold"), 
             command=self.root.destroy)
         self.canvas.create_window(200, 100, anchor="nw", window=gameOverButton)
+
+    def drawSnakes(self, snakes, ownId) -> None:
+        """
+            This method draws the snakes of a network match, creating a
+            line for each new snake and deleting those that left.
+        """
+        for playerId in list(self.matchSnakeIcons):
+            if playerId not in snakes:
+                self.canvas.delete(self.matchSnakeIcons.pop(playerId))
+        for playerId, points in snakes.items():
+            if len(points) < 2:
+                continue
+            icon = self.matchSnakeIcons.get(playerId)
+            if icon is None:
+                colour = ICON_COLOUR if playerId == ownId else OTHER_ICON_COLOUR
+                icon = self.matchSnakeIcons[playerId] = self.canvas.create_line(
+                    (0, 0), (0, 0), fill=colour, width=SNAKE_ICON_WIDTH)
+            self.canvas.coords(icon, *[x for point in points for x in point])
+
+    def toggleHud(self, e=None) -> None:
+        """
+            This method shows or hides the performance HUD. The profiler
+            only runs while the HUD is shown, unless it exports samples.
+        """
+        self.hudVisible = not self.hudVisible
+        game.profiler.setEnabled(self.hudVisible)
+        if self.hudJob is not None:
+            self.root.after_cancel(self.hudJob)
+            self.hudJob = None
+        self.canvas.itemconfigure(self.hud, state="normal" if self.hudVisible else "hidden")
+        if self.hudVisible:
+            self.updateHud()
+
+    def updateHud(self) -> None:
+        """
+            This method refreshes the HUD text twice per second.
+        """
+        self.canvas.itemconfigure(self.hud, text="\n".join(game.profiler.hudLines()))
+        #segments created since the last refresh are stacked above the HUD
+        self.canvas.tag_raise(self.hud)
+        self.hudJob = self.root.after(500, self.updateHud)
     
 
+class SegmentRenderer():
+    """
+        This class draws a snake as a ring of pooled canvas rectangles,
+        one per segment. When the snake moves, the tail rectangle is moved
+        to the new head, and a rectangle is only created when the snake
+        grows, so each tick costs the same number of Tk calls however long
+        the snake is.
+    """
+    def __init__(self, canvas, width, colour) -> None:
+        self.canvas = canvas
+        self.half = width/2
+        self.colour = colour
+        self.items = deque()    #canvas items, tail first and head last
+
+    def segmentCoordinates(self, point) -> tuple:
+        x, y = point
+        return (x - self.half, y - self.half, x + self.half, y + self.half)
+
+    def createItem(self, point) -> int:
+        return self.canvas.create_rectangle(
+            *self.segmentCoordinates(point), fill=self.colour, outline=self.colour)
+
+    def reset(self, points) -> None:
+        """
+            This method draws a whole snake, reusing the existing items.
+        """
+        while len(self.items) > len(points):
+            self.canvas.delete(self.items.pop())
+        for item, point in zip(self.items, points):
+            self.canvas.coords(item, *self.segmentCoordinates(point))
+        for point in points[len(self.items):]:
+            self.items.append(self.createItem(point))
+
+    def advance(self, head, grew) -> None:
+        """
+            This method moves the snake forward by one segment: a new item
+            at the head if the snake grew, otherwise the tail item moved to
+            the head.
+        """
+        if grew or not self.items:
+            self.items.append(self.createItem(head))
+            return
+        item = self.items.popleft()
+        self.canvas.coords(item, *self.segmentCoordinates(head))
+        self.items.append(item)
+
+
 class QueueHandler():
     """
         This class implements the queue handler for the game.
     """
-    def __init__(self) -> None:
+    def __init__(self, pollDelay=100) -> None:
         self.queue = gameQueue
         self.gui = gui
+        #milliseconds between checks of an empty queue
+        self.pollDelay = pollDelay
         self.queueHandler()
     
     def queueHandler(self) -> None:
@@ -69,55 +180,123 @@ class QueueHandler():
             This method handles the queue by constantly retrieving
             tasks from it and accordingly taking the corresponding
             action.
-            A task could be: game_over, move, prey, score.
+            A task could be: game_over, move, advance, view, prey, score,
+            snakes, preys.
             Each item in the queue is a dictionary whose key is
             the task type (for example, "move") and its value is
             the corresponding task value.
             If the queue.empty exception happens, it schedules 
             to call itself after a short delay.
+            While profiling, the tasks of a tick carry a "profile" stamp
+            (tick, time put, time of the key press it applied) and the
+            frame is repainted at once so the draw time includes it.
         '''
+        profiler = game.profiler
+        profiling = profiler.enabled
+        if profiling:
+            begin = time.perf_counter()
+            stamp = None
+            #the first key press applied by the ticks drawn in this frame
+            keyTime = None
         try:
             while True:
                 task = self.queue.get_nowait()
+                if profiling and "profile" in task:
+                    stamp = task["profile"]
+                    profiler.record("queue", time.perf_counter() - stamp[1], stamp[0])
+                    if keyTime is None:
+                        keyTime = stamp[2]
                 if "game_over" in task:
                     gui.gameOver()
+                elif "advance" in task:
+                    gui.snakeIcon.advance(*task["advance"])
                 elif "move" in task:
-                    points = [x for point in task["move"] for x in point]
-                    gui.canvas.coords(gui.snakeIcon, *points)
+                    gui.snakeIcon.reset(task["move"])
+                elif "view" in task:
+                    #the part of a large board in the window, in window coordinates
+                    segments, prey = task["view"]
+                    gui.snakeIcon.reset(segments)
+                    gui.canvas.coords(gui.preyIcon, *prey)
                 elif "prey" in task:
                     gui.canvas.coords(gui.preyIcon, *task["prey"])
                 elif "score" in task:
                     gui.canvas.itemconfigure(
                         gui.score, text=f"Your Score: {task['score']}")
+                elif "snakes" in task:
+                    gui.drawSnakes(task["snakes"], task["own"])
+                elif "preys" in task:
+                    gui.preyIcons.reset(task["preys"])
                 self.queue.task_done()
         except queue.Empty:
-            gui.root.after(100, self.queueHandler)
+            if profiling and stamp is not None:
+                gui.root.update_idletasks()
+                now = time.perf_counter()
+                profiler.record("draw", now - begin)
+                profiler.frameDone(now)
+                if keyTime is not None:
+                    profiler.record("key", now - keyTime)
+            gui.root.after(self.pollDelay, self.queueHandler)
 
 
 class Game():
     '''
-        This class implements most of the game functionalities.
+        This class connects the game engine to the gui. The rules
+        themselves live in snake_engine.SnakeEngine; this class only
+        drives it in real time and turns its results into queue tasks.
     '''
-    def __init__(self) -> None:
+    def __init__(self, seed=None, recordTo=None, replayFrom=None, speed=1, autopilot=None,
+                 profileTo=None, world=None) -> None:
         """
-           This initializer sets the initial snake coordinate list, movement
-           direction, and arranges for the first prey to be created.
+           This initializer creates the engine from the GUI constants
+           and arranges for the first prey to be displayed.
+           With recordTo the session is saved to that file; with
+           replayFrom a saved session is played back instead, speed
+           times faster than real time. autopilot names a strategy of
+           snake_autopilot that steers the snake instead of the keys.
+           With profileTo the timings of every tick are saved to that
+           CSV file. world is (cols, rows) of a board larger than the
+           window, which is then seen through a camera following the head.
         """
         self.queue = gameQueue
-        self.score = 0
-        #starting length and location of the snake
-        #note that it is a list of tuples, each being an
-        #(x, y) tuple. Initially its size is 5 tuples.       
-        self.snakeCoordinates = [(495, 55), (485, 55), (475, 55),
-                                 (465, 55), (455, 55)]
-        #initial direction of the snake
-        self.direction = "Left"
         self.gameNotOver = True
-        #initialize the attribute
-        self.prey_position=None
-        self.createNewPrey()
-        #this factor controls how fast the game goes
-        self._time_factor = 1    #this is set to 1 at first
+        self.speed = speed
+        self.recorder = None
+        self.player = None
+        self.profiler = TickProfiler(profileTo)
+        if replayFrom is not None:
+            #the recording brings its own seed and configuration
+            self.player = ReplayPlayer.load(replayFrom)
+            recorded = self.player.config
+            if recorded.windowWidth > WINDOW_WIDTH or recorded.windowHeight > WINDOW_HEIGHT:
+                #a board larger than the window keeps the snake in chunks, as with --world
+                self.player = ReplayPlayer.load(replayFrom, chunkCells=CHUNK_CELLS)
+            self.engine = self.player.engine
+            self.stepper = self.player.step
+        else:
+            if world is not None:
+                config = worldConfig(*world, snakeIconWidth=SNAKE_ICON_WIDTH,
+                                     preyIconWidth=PREY_ICON_WIDTH, movement=MOVEMENT)
+            else:
+                config = GameConfig(
+                    windowWidth=WINDOW_WIDTH, windowHeight=WINDOW_HEIGHT,
+                    snakeIconWidth=SNAKE_ICON_WIDTH, preyIconWidth=PREY_ICON_WIDTH,
+                    movement=MOVEMENT)
+            self.engine = SnakeEngine(config, seed)
+            self.stepper = self.engine.step
+            if recordTo is not None:
+                self.recorder = ReplayRecorder(self.engine)
+                self.recordTo = recordTo
+                self.stepper = self.recorder.step
+        self.autopilot = Autopilot(autopilot) if autopilot is not None and self.player is None else None
+        #only the part of a board larger than the window around the head is drawn
+        config = self.engine.config
+        self.camera = None
+        if config.windowWidth > WINDOW_WIDTH or config.windowHeight > WINDOW_HEIGHT:
+            self.camera = Camera(WINDOW_WIDTH, WINDOW_HEIGHT, config)
+            self.queue.put({'view': self.camera.view(self.engine)})
+        else:
+            self.queue.put({'prey': self.engine.prey_position})
+            self.queue.put({'move': list(self.engine.snakeCoordinates)})
 
     def superloop(self) -> None:
         """
@@ -131,9 +310,8 @@ class Game():
         while self.gameNotOver:
             #call the move instance to get the sneak moving
             self.move()
-            #We can set fixed wait time between each move task is called
-            #later on we can change time factor so we can speed up or down the movements
-            time.sleep(SPEED*self._time_factor)
+            #the engine lowers its time factor each time the snake eats
+            time.sleep(SPEED*self.engine._time_factor/self.speed)
 
     def whenAnArrowKeyIsPressed(self, e) -> None:
         """ 
@@ -141,161 +319,190 @@ class Game():
             and is called when one of those is clicked.
             It sets the movement direction based on 
             the key that was pressed by the gamer.
-            Use as is.
-        """
-        currentDirection = self.direction
-        #ignore invalid keys
-        if (currentDirection == "Left" and e.keysym == "Right" or 
-            currentDirection == "Right" and e.keysym == "Left" or
-            currentDirection == "Up" and e.keysym == "Down" or
-            currentDirection == "Down" and e.keysym == "Up"):
+        """
+        #a replay only follows the recorded directions
+        if self.player is not None:
             return
-        self.direction = e.keysym
+        direction = self.engine.direction
+        #the engine ignores turning back onto the body
+        self.engine.turn(e.keysym)
+        if self.profiler.enabled and self.engine.direction != direction:
+            self.profiler.keyPressed()
 
     def move(self) -> None:
         """ 
-            This method implements what is needed to be done
-            for the movement of the snake.
-            It generates a new snake coordinate. 
-            If based on this new movement, the prey has been 
-            captured, it adds a task to the queue for the updated
-            score and also creates a new prey.
-            It also calls a corresponding method to check if 
-            the game should be over. 
-            The snake coordinates list (representing its length 
-            and position) should be correctly updated.
-        """
-        #NewSnakeCorrdinates has the snake head coordinates as a tuples
-        NewSnakeCoordinates = self.calculateNewCoordinates()
-        #complete the method implementation below
-        #first check if the agan is over if over inside the isGameOver will call gameover
-        self.isGameOver(NewSnakeCoordinates)
-        
-        #game is not over yet
-        if self.gameNotOver:
-            #check to see if the snake has eat the prey
-            #that requrires snake location and prey location comparison
-            #express the snake head coordinates to head_x and head_y
-            x_head,y_head=NewSnakeCoordinates
-            x1_prey,y1_prey,x2_prey,y2_prey=self.prey_position
-            #if the snake head is in the snake head location and the snake head is within the bound of the prey +/- half the SNAKE_ICON_WIDTH it will be consider captured
-            if (x1_prey-(SNAKE_ICON_WIDTH/2) <= x_head <= x2_prey+(SNAKE_ICON_WIDTH/2)) and (y1_prey-(SNAKE_ICON_WIDTH/2) <= y_head <= y2_prey+(SNAKE_ICON_WIDTH/2)):
-                #the snake has ate the prey
-                #so we need to make the snake longer
-                self.snakeCoordinates.append(NewSnakeCoordinates)
-                #need to give snake a point
-                self.score=self.score+1
-                #also need to let the game queue handler know to update the score too
-                self.queue.put({"score":self.score})           
-                #we need to call the next prey location
-                self.createNewPrey()
-                #we increase the snake speed by 10% each time it has ate a prey 
-                if self._time_factor > 0.4:
-                    #if the time factor is > 40% then we increase the speed by 10% every time it ate.
-                    self._time_factor-=0.1
-            else:
-                #the sanek head has not ate the prey 
-                #so nothign happens aside from updating the snake corrdinates tuple list
-                #the head is at the last of the tuple list so append to the last
-                self.snakeCoordinates.append(NewSnakeCoordinates)
-                #remove the tail so pop the first
-                self.snakeCoordinates.pop(0)                 
-                
-            #put the move task to the game handleing queue
-            self.queue.put({"move": self.snakeCoordinates})
-        #Game is over 
-        else:
+            This method steps the engine by one tick and adds the
+            corresponding tasks (score, prey, advance or view, or
+            game_over) to the queue.
+        """
+        profiler = self.profiler
+        profiling = profiler.enabled
+        if self.autopilot is not None:
+            self.engine.turn(self.autopilot.decide(self.engine))
+        if profiling:
+            begin = time.perf_counter()
+        event = self.stepper()
+        if profiling:
+            now = time.perf_counter()
+            profiler.record("step", now - begin, self.engine.tick)
+            profiler.tickDone(now)
+        if event == GAME_OVER:
+            self.gameNotOver = False
+            self.saveRecording()
             #game over we need to let game queue handle know
-            self.queue.put({"game_over":True})
-            return
-            
-
-    def calculateNewCoordinates(self) -> tuple:
-        """
-            This method calculates and returns the new 
-            coordinates to be added to the snake
-            coordinates list based on the movement
-            direction and the current coordinate of 
-            head of the snake.
-            It is used by the move() method.    
-        """
-        lastX, lastY = self.snakeCoordinates[-1]
-        #complete the method implementation below
-        #the lastx and lasty are tuple of snake head
-        match self.direction:
-            case'Up':
-                new_x=lastX
-                #the y direct grows down, so the top left is (0,0) bottom right is (windows width, windous height), so - to go up
-                new_y=lastY - MOVEMENT
-            case 'Down':
-                new_x=lastX
-                #the y direct grows down, so the top left is (0,0) bottom right is (windows width, windous height), so + to go up
-                new_y=lastY + MOVEMENT                
-            case 'Left':
-                new_x=lastX - MOVEMENT
-                new_y=lastY
-            case 'Right':
-                new_x=lastX + MOVEMENT
-                new_y=lastY
-            case _:
-                new_x=lastX
-                new_y=lastY 
-        #retun the new coordinate
-        return (new_x,new_y)
-
-    def isGameOver(self, snakeCoordinates) -> None:
-        """
-            This method checks if the game is over by 
-            checking if now the snake has passed any wall
-            or if it has bit itself.
-            If that is the case, it updates the gameNotOver 
-            field and also adds a "game_over" task to the queue. 
-        """
-        x, y = snakeCoordinates
-        #complete the method implementation below
-        snake_die=False
-        #check to see if the snake hits the border the border is at x[0 to window width] y[0 to window height]
-        if x > WINDOW_WIDTH or x < 0 or y > WINDOW_HEIGHT or y <0:
-            snake_die=True
-        #check to see if the snake hit it's self on the head
-        elif snakeCoordinates in self.snakeCoordinates:
-            snake_die=True
-            
-        if snake_die:
-            #Set gameNotOver to False and we need to trigger gameover in GameQueneHandle
-            self.gameNotOver=False
-            #let the game queue handle know =
-            self.queue.put({'game_over': True})
+            self.queue.put({"game_over": True})
             return
+        if event == ATE:
+            self.queue.put({"score": self.engine.score})
+            if self.camera is None:
+                self.queue.put({"prey": self.engine.prey_position})
+        if self.camera is not None:
+            #the camera may have moved, so the segments in the window are sent again
+            task = {"view": self.camera.view(self.engine)}
+        else:
+            #only the new head is sent, the renderer keeps the rest of the snake
+            task = {"advance": (self.engine.snakeCoordinates[-1], event == ATE)}
+        if profiling:
+            task["profile"] = (self.engine.tick, time.perf_counter(), profiler.takeKey())
+        self.queue.put(task)
 
-    def createNewPrey(self) -> None:
-        """ 
-            This methods picks an x and a y randomly as the coordinate 
-            of the new prey and uses that to calculate the 
-            coordinates (x - 5, y - 5, x + 5, y + 5). [you need to replace 5 with a constant]
-            It then adds a "prey" task to the queue with the calculated
-            rectangle coordinates as its value. This is used by the 
-            queue handler to represent the new prey.                    
-            To make playing the game easier, set the x and y to be THRESHOLD
-            away from the walls. 
-        """
-        THRESHOLD = 15   #sets how close prey can be to borders
-        #this randomly generate prey in side the canvas and also not on the border. 
-        x=random.randint(THRESHOLD,WINDOW_WIDTH-THRESHOLD)
-        y=random.randint(THRESHOLD,WINDOW_HEIGHT-THRESHOLD)
-        #this ensures the randomly generate prey don't land on top of the snake
-        while (x,y) in self.snakeCoordinates:
-            #complete the method implementation 
-            x=random.randint(THRESHOLD,WINDOW_WIDTH-THRESHOLD)
-            y=random.randint(THRESHOLD,WINDOW_HEIGHT-THRESHOLD)
-        
-        #calcuate the rectangle coordinates
-        rectangleCoordinates=(x-(PREY_ICON_WIDTH/2),y-(PREY_ICON_WIDTH/2),x+(PREY_ICON_WIDTH/2),y+(PREY_ICON_WIDTH/2))
-        #we need the prey position to be know to other instances and this creay new prey does not even return anything
-        self.prey_position=rectangleCoordinates
-        
-        #add the prey task to the queue
-        self.queue.put({'prey':self.prey_position})
+    def saveRecording(self) -> None:
+        """
+            This method writes the recorded session, if any, to its file.
+        """
+        if self.recorder is not None:
+            self.recorder.save(self.recordTo)
+
+
+class NetworkGame():
+    '''
+        This class takes the place of Game when playing on a match server
+        (snake_net.MatchServer). The server runs the game; this class sends
+        the arrow keys to it and turns the match state, interpolated between
+        the last two ticks, into queue tasks at a steady frame rate.
+    '''
+    def __init__(self, host, port, spectate=False, profileTo=None) -> None:
+        self.queue = gameQueue
+        self.client = MatchClient(host, port, spectate)
+        #the server runs the ticks, so only the queue and draw phases are timed
+        self.profiler = TickProfiler(profileTo)
+        self.lastPrey = None
+        self.lastScore = None
+
+    def superloop(self) -> None:
+        """
+            This method sends a frame of tasks to the queue 30 times per
+            second until the server closes the connection.
+        """
+        FRAME_TIME = 1/30     #time between frames (sec)
+        while self.client.connected:
+            self.move()
+            time.sleep(FRAME_TIME)
+        self.queue.put({"game_over": True})
+
+    def whenAnArrowKeyIsPressed(self, e) -> None:
+        """
+            This method sends the pressed arrow key to the server.
+        """
+        self.client.turn(e.keysym)
+
+    def move(self) -> None:
+        """
+            This method adds the snakes, prey and score tasks for one frame.
+        """
+        snakes, prey, scores = self.client.snapshot()
+        if prey is not None and prey != self.lastPrey:
+            self.lastPrey = prey
+            self.queue.put({"prey": prey})
+        score = scores.get(self.client.playerId)
+        if score is not None and score != self.lastScore:
+            self.lastScore = score
+            self.queue.put({"score": score})
+        task = {"snakes": snakes, "own": self.client.playerId}
+        if self.profiler.enabled:
+            task["profile"] = (None, time.perf_counter(), None)
+        self.queue.put(task)
+
+
+class ArenaGame():
+    '''
+        This class takes the place of Game in an arena (snake_arena): the
+        player and numSnakes - 1 snakes of agents on one large board. The
+        agents decide in worker processes when there is more than one CPU,
+        and the window follows the player's snake.
+    '''
+    def __init__(self, numSnakes, seed=None, profileTo=None) -> None:
+        self.queue = gameQueue
+        workers = (os.cpu_count() or 1) - 1
+        self.arena = newArena(numSnakes, seed, workers, movement=MOVEMENT,
+                              snakeIconWidth=SNAKE_ICON_WIDTH, preyIconWidth=PREY_ICON_WIDTH)
+        #the first player of the arena is steered by the arrow keys
+        self.playerId = 0
+        self.arena.humans.add(self.playerId)
+        self.camera = Camera(WINDOW_WIDTH, WINDOW_HEIGHT, self.arena.config)
+        self.profiler = TickProfiler(profileTo)
+        self.lastScore = None
+        self.running = True
+        #held during a tick, so the workers are not stopped in the middle of one
+        self.lock = threading.Lock()
+
+    def superloop(self) -> None:
+        """
+            This method steps the arena every SPEED seconds, less the time
+            the tick took, until the window is closed.
+        """
+        SPEED = 0.15     #speed of snake updates (sec)
+        while True:
+            begin = time.perf_counter()
+            with self.lock:
+                if not self.running:
+                    break
+                self.move()
+            time.sleep(max(0, SPEED - (time.perf_counter() - begin)))
+
+    def whenAnArrowKeyIsPressed(self, e) -> None:
+        """
+            This method turns the player's snake.
+        """
+        self.arena.turn(self.playerId, e.keysym)
+
+    def move(self) -> None:
+        """
+            This method lets the agents decide, steps the arena and adds the
+            snakes and prey in the window and the score to the queue.
+        """
+        profiler = self.profiler
+        profiling = profiler.enabled
+        if profiling:
+            begin = time.perf_counter()
+        self.arena.steer()
+        self.arena.step()
+        if profiling:
+            now = time.perf_counter()
+            profiler.record("step", now - begin, self.arena.tick)
+            profiler.tickDone(now)
+        #while the player waits to respawn the window stays where it was
+        engine = self.arena.snakes.get(self.playerId)
+        if engine is not None:
+            self.camera.follow(engine.snakeCoordinates[-1])
+        score = self.arena.scores.get(self.playerId)
+        if score is not None and score != self.lastScore:
+            self.lastScore = score
+            self.queue.put({"score": score})
+        snakes, prey = self.arena.visible(self.camera.left, self.camera.top, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.queue.put({"preys": prey})
+        task = {"snakes": snakes, "own": self.playerId}
+        if profiling:
+            task["profile"] = (self.arena.tick, time.perf_counter(), None)
+        self.queue.put(task)
+
+    def close(self) -> None:
+        """
+            This method stops the worker processes of the agents.
+        """
+        with self.lock:
+            self.running = False
+            self.arena.close()
 
 
 if __name__ == "__main__":
@@ -310,17 +517,83 @@ if __name__ == "__main__":
     MOVEMENT = 15
     
     BACKGROUND_COLOUR, ICON_COLOUR = "black", "yellow"
+    #colour of the other players' snakes in a network match
+    OTHER_ICON_COLOUR = "deep sky blue"
 
     gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
 
-    game = Game()        #instantiate the game object
+    #optionally record the session or play a recorded one back
+    parser = argparse.ArgumentParser(description="Snake game")
+    parser.add_argument("--seed", type=int, help="seed for the prey placement")
+    parser.add_argument("--record", metavar="FILE", help="save the session to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play the session saved in FILE")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed factor")
+    parser.add_argument("--autopilot", choices=STRATEGIES, help="let the computer play")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="join a match server (snake_net.py)")
+    parser.add_argument("--spectate", action="store_true", help="watch the match instead of playing")
+    parser.add_argument("--hud", action="store_true", help="show the performance HUD (toggle with F3)")
+    parser.add_argument("--profile-csv", metavar="FILE", help="save the timings of every tick to FILE")
+    parser.add_argument("--world", metavar="COLSxROWS", help="play on a board of COLS x ROWS cells with a scrolling view")
+    parser.add_argument("--arena", type=int, metavar="SNAKES", help="play against SNAKES - 1 computer snakes")
+    args = parser.parse_args()
+    world = None
+    if args.world:
+        try:
+            world = tuple(int(size) for size in args.world.lower().split("x"))
+        except ValueError:
+            world = ()
+        if len(world) != 2 or min(world) < 2:
+            parser.error("--world expects the board size as COLSxROWS, for example 2000x1000")
+        try:
+            worldConfig(*world)
+        except ValueError as error:
+            parser.error(f"--world: {error}")
+        if args.autopilot:
+            parser.error("the autopilot plans over every cell and cannot be used with --world")
+    if args.speed <= 0:
+        parser.error("--speed must be greater than 0")
+    if args.replay:
+        #the recording brings its own seed, board and moves
+        ignored = [option for option, value in (("--seed", args.seed is not None), ("--record", args.record),
+                                                ("--autopilot", args.autopilot), ("--world", args.world), ("--connect", args.connect))
+                   if value]
+        if ignored:
+            parser.error(f"--replay cannot be used with {', '.join(ignored)}")
+    if args.arena is not None:
+        if args.arena < 1:
+            parser.error("--arena expects the number of snakes, at least 1")
+        #the arena has a board of its own, a human player and no recording
+        ignored = [option for option, value in (("--world", args.world), ("--record", args.record),
+                                                ("--replay", args.replay), ("--autopilot", args.autopilot),
+                                                ("--connect", args.connect)) if value]
+        if ignored:
+            parser.error(f"--arena cannot be used with {', '.join(ignored)}")
+
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        game = NetworkGame(host, int(port), args.spectate, args.profile_csv)
+    elif args.arena:
+        game = ArenaGame(args.arena, args.seed, args.profile_csv)
+    else:
+        game = Game(args.seed, args.record, args.replay, args.speed, args.autopilot,
+                    args.profile_csv, world)        #instantiate the game object
 
     gui = Gui()    #instantiate the game user interface
+    if args.hud:
+        gui.toggleHud()
     
-    QueueHandler()  #instantiate the queue handler    
+    #a network match is redrawn at 30 frames per second
+    QueueHandler(30 if args.connect or args.arena else 100)  #instantiate the queue handler    
     
     #start a thread with the main loop of the game
     threading.Thread(target = game.superloop, daemon=True).start()
 
     #start the GUI's own event loop
-    gui.root.mainloop()
\ No newline at end of file
+    gui.root.mainloop()
+
+    #keep the recording of a session that was closed before the game ended
+    if args.arena:
+        game.close()
+    elif not args.connect:
+        game.saveRecording()
+    game.profiler.save()
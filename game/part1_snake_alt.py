@@ -6,11 +6,18 @@
     game (https://en.wikipedia.org/wiki/Snake_(video_game_genre))
 """
 
+import argparse
 import threading
 import queue  # Thread-safe queue
 import pygame
-import random
 import time
+from collections import deque
+
+from snake_engine import SnakeEngine, GameConfig, ATE, GAME_OVER, CHUNK_CELLS
+from snake_replay import ReplayRecorder, ReplayPlayer
+from snake_autopilot import Autopilot, STRATEGIES
+from snake_profile import TickProfiler
+from snake_world import Camera, worldConfig
 
 class Gui():
     """
@@ -40,64 +47,237 @@ class Gui():
         self.preyIcon = None  #current prey location
         self.score_text = 0  #player's current score
 
-        self.screen.fill(pygame.Color(BACKGROUND_COLOUR))
+        #what is currently on the screen, so each frame only repaints what changed
+        self.background = pygame.Color(BACKGROUND_COLOUR)
+        self.icon_colour = pygame.Color(ICON_COLOUR)
+        self.drawn_snake = deque()  #segments on the screen, head last
+        self.drawn_prey = None  #prey on the screen
+        self.drawn_score = None  #score on the screen
+        self.score_surface = None  #cached rendering of the score text
+        self.score_rect = None  #screen area of the score text
+        self.full_redraw = True  #repaint everything on the next frame
+
+        #performance HUD in the bottom right corner, toggled with F3
+        self.hud_font = pygame.font.Font(None, 18)
+        self.hud_visible = False
+        self.hud_lines = None  #text the HUD should show
+        self.hud_updated = 0  #time of the last HUD refresh
+        self.drawn_hud = None  #text of the HUD on the screen
+        self.hud_surface = None  #cached rendering of the HUD text
+        self.hud_rect = None  #screen area of the HUD
+
+        self.screen.fill(self.background)
 
     def gameOver(self) -> None:
         """
         This method is used at the end to display a
         game over message and gracefully exit on SPACE key press.
         """
+        try:
+            #the message does not change, so it is drawn once
+            self.screen.fill(self.background) #clear screen
+            game_over_text = self.font.render("Game Over! Press SPACE to Exit", True, self.text_colour) #game over message
+            game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 3))    #text positioning
+            self.screen.blit(game_over_text, game_over_rect)    #draw text
+            pygame.display.flip() #update display
+        except pygame.error:
+            self.running = False  #the display is already closed
+
         while self.running:
             for event in pygame.event.get(): #process pygame events
                 if event.type == pygame.QUIT: #allow window close
                     self.running = False
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE: #exit game on space key
                     self.running = False  # Graceful exit
-
-            #exit the loop if the game is no longer running
-            if not self.running:
-                break  
-
-            self.screen.fill(pygame.Color(BACKGROUND_COLOUR)) #clear screen
-            game_over_text = self.font.render("Game Over! Press SPACE to Exit", True, pygame.Color("white")) #game over message
-            game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 3))    #text positioning
-            self.screen.blit(game_over_text, game_over_rect)    #draw text
-            pygame.display.flip() #update display
+            self.clock.tick(30) #wait for the next frame instead of spinning
         #free up system resources
         pygame.quit()
         #return to the main loop and finish
         return None
-    
+
+    def segment_rect(self, segment) -> pygame.Rect:
+        """
+        This method returns the screen area of one snake segment.
+        """
+        return pygame.Rect(segment[0] - 5, segment[1] - 5, SNAKE_ICON_WIDTH, SNAKE_ICON_WIDTH)
+
+    def prey_rect(self, prey) -> pygame.Rect:
+        """
+        This method returns the screen area of the prey.
+        """
+        return pygame.Rect(prey[0], prey[1], PREY_ICON_WIDTH, PREY_ICON_WIDTH)
+
+    def redraw_all(self) -> None:
+        """
+        This method repaints the whole screen from the current game state.
+        """
+        self.screen.fill(self.background)
+        self.drawn_snake = deque(self.snakeIcon or ())
+        for segment in self.drawn_snake: #draw snake segments as rectangles
+            pygame.draw.rect(self.screen, self.icon_colour, self.segment_rect(segment))
+        self.drawn_prey = self.preyIcon
+        if self.drawn_prey: #draw prey as a rectangle
+            pygame.draw.rect(self.screen, self.icon_colour, self.prey_rect(self.drawn_prey))
+        self.draw_score()
+        self.drawn_hud = self.hud_rect = None
+        self.draw_hud([]) #the screen was cleared, so the HUD is drawn from scratch
+        pygame.display.flip() #update the display
+        self.full_redraw = False
+
+    def draw_score(self) -> pygame.Rect:
+        """
+        This method draws the score, rendering the text again only when
+        the score has changed, and returns the area it covers.
+        """
+        if self.score_text != self.drawn_score:
+            self.score_surface = self.font.render(f"Score: {self.score_text}", True, self.text_colour)
+            self.score_rect = self.score_surface.get_rect(topleft=(10, 10))
+            self.drawn_score = self.score_text
+        self.screen.blit(self.score_surface, self.score_rect)
+        return self.score_rect
+
+    def toggle_hud(self, profiler) -> None:
+        """
+        This method shows or hides the performance HUD. The profiler only
+        runs while the HUD is shown, unless it exports samples.
+        """
+        self.hud_visible = not self.hud_visible
+        profiler.setEnabled(self.hud_visible)
+        self.hud_updated = 0
+
+    def update_hud(self, profiler) -> None:
+        """
+        This method takes new HUD text from the profiler twice per second.
+        """
+        if not self.hud_visible:
+            self.hud_lines = None
+            return
+        now = time.perf_counter()
+        if now - self.hud_updated >= 0.5:
+            self.hud_lines = profiler.hudLines()
+            self.hud_updated = now
+
+    def draw_hud(self, dirty) -> None:
+        """
+        This method draws the HUD again when its text changed or when an
+        area under it was repainted, and adds what it touched to dirty.
+        """
+        if self.hud_lines != self.drawn_hud:
+            old_rect = self.hud_rect
+            self.drawn_hud, self.hud_surface, self.hud_rect = self.hud_lines, None, None
+            if old_rect:
+                self.restore_area(old_rect, whole_snake=True)
+                dirty.append(old_rect)
+            if self.hud_lines:
+                lines = [self.hud_font.render(line, True, self.text_colour) for line in self.hud_lines]
+                self.hud_surface = pygame.Surface((max(line.get_width() for line in lines),
+                                                   sum(line.get_height() for line in lines)), pygame.SRCALPHA)
+                top = 0
+                for line in lines:
+                    self.hud_surface.blit(line, line.get_rect(topright=(self.hud_surface.get_width(), top)))
+                    top += line.get_height()
+                self.hud_rect = self.hud_surface.get_rect(bottomright=(WINDOW_WIDTH - 5, WINDOW_HEIGHT - 5))
+        elif self.hud_rect is None or self.hud_rect.collidelist(dirty) == -1:
+            return
+        if self.hud_surface:
+            #the text is blended onto the screen, so clear under it first
+            self.restore_area(self.hud_rect, whole_snake=True)
+            self.screen.blit(self.hud_surface, self.hud_rect)
+            dirty.append(self.hud_rect)
+
+    def restore_area(self, rect, whole_snake=False) -> None:
+        """
+        This method clears rect and repaints what is on the screen there.
+        Snake segments on a lattice do not overlap, so normally only the
+        tail has to be checked; whole_snake checks every segment.
+        """
+        self.screen.fill(self.background, rect)
+        if whole_snake:
+            segments = self.drawn_snake
+        else:
+            segments = (self.drawn_snake[0],) if self.drawn_snake else ()
+        for segment in segments:
+            segment_rect = self.segment_rect(segment)
+            if segment_rect.colliderect(rect):
+                pygame.draw.rect(self.screen, self.icon_colour, segment_rect)
+        if self.drawn_prey and self.prey_rect(self.drawn_prey).colliderect(rect):
+            pygame.draw.rect(self.screen, self.icon_colour, self.prey_rect(self.drawn_prey))
+
+    def on_lattice(self, segment) -> bool:
+        """
+        This method checks if a segment lies on the grid of cells the head
+        moves along, where segments never overlap each other.
+        """
+        head_x, head_y = self.drawn_snake[-1]
+        return ((segment[0] - head_x) % MOVEMENT == 0 and (segment[1] - head_y) % MOVEMENT == 0
+                and SNAKE_ICON_WIDTH <= MOVEMENT)
+
+    def count_new_segments(self, snake) -> int:
+        """
+        This method returns by how many ticks the snake moved since the
+        last frame, or None if the drawn head is no longer in the snake.
+        """
+        if not self.drawn_snake:
+            return None
+        head = self.drawn_snake[-1]
+        for moved in range(len(snake)):
+            if snake[-1 - moved] == head:
+                return moved
+        return None
+
     def draw_game(self) -> None:
         '''
         This method is used to set up the GUI and draw the necessary objects using pygame.
+        Only the areas that changed since the last frame (new head, vacated tail,
+        prey and score) are repainted and passed to pygame.display.update.
         '''
         try:
-            self.screen.fill(pygame.Color(BACKGROUND_COLOUR))
-
-            if self.snakeIcon: #draw snake segments as rectangles
-                for segment in self.snakeIcon:
-                    pygame.draw.rect(
-                        self.screen,
-                        pygame.Color(ICON_COLOUR),
-                        (segment[0] - 5, segment[1] - 5, SNAKE_ICON_WIDTH, SNAKE_ICON_WIDTH),
-                    )
-
-            if self.preyIcon: #draw prey as a rectangle
-                pygame.draw.rect(
-                    self.screen,
-                    pygame.Color(ICON_COLOUR),
-                    (self.preyIcon[0], self.preyIcon[1],
-                     PREY_ICON_WIDTH, PREY_ICON_WIDTH)
-                )
-
-            score_text = self.font.render(
-                f"Score: {self.score_text}", True, pygame.Color("white")
-            )
-            
-            #display current score
-            self.screen.blit(score_text, (10, 10))
-            pygame.display.flip() #update the display
+            snake = self.snakeIcon or ()
+            moved = self.count_new_segments(snake)
+            if self.full_redraw or moved is None:
+                self.redraw_all()
+                return
+
+            dirty = []
+            drawn = self.drawn_snake
+            #the snake advanced by moved segments and lost its old tail segments
+            vacated = [drawn.popleft() for _ in range(len(drawn) + moved - len(snake))]
+            drawn.extend(snake[len(snake) - moved:])
+            for segment in vacated:
+                rect = self.segment_rect(segment)
+                #segments off the head's lattice (the starting snake) can overlap any neighbour
+                self.restore_area(rect, whole_snake=not (self.on_lattice(segment) and self.on_lattice(drawn[0])))
+                dirty.append(rect)
+            for segment in snake[len(snake) - moved:]:
+                rect = self.segment_rect(segment)
+                pygame.draw.rect(self.screen, self.icon_colour, rect)
+                dirty.append(rect)
+
+            if self.preyIcon != self.drawn_prey: #the prey moved after being eaten
+                old_prey, self.drawn_prey = self.drawn_prey, self.preyIcon
+                if old_prey:
+                    rect = self.prey_rect(old_prey)
+                    self.restore_area(rect, whole_snake=True)
+                    dirty.append(rect)
+                if self.drawn_prey:
+                    rect = self.prey_rect(self.drawn_prey)
+                    pygame.draw.rect(self.screen, self.icon_colour, rect)
+                    dirty.append(rect)
+
+            #display current score on top of everything else
+            if self.score_text != self.drawn_score:
+                old_rect = self.score_rect
+                self.restore_area(old_rect, whole_snake=True)
+                dirty.append(old_rect.union(self.draw_score()))
+            elif self.score_rect.collidelist(dirty) != -1:
+                #the text is blended onto the screen, so clear under it first
+                self.restore_area(self.score_rect, whole_snake=True)
+                dirty.append(self.draw_score())
+
+            self.draw_hud(dirty)
+
+            if dirty:
+                pygame.display.update(dirty) #update only the changed areas
 
         except pygame.error:
             self.running = False  #exit gracefully if the display is closed
@@ -107,7 +287,8 @@ class Gui():
         This method is to run the game continuously using pygame (alternative to gui.root.mainloop()). 
         The purpose is to provide modularity to the alternative approach.
         '''
-        handler = QueueHandler(gameQueue, self) #create a queue handler to manage game events
+        handler = QueueHandler(gameQueue, self, game.profiler) #create a queue handler to manage game events
+        profiler = game.profiler
 
         #main game event loop
         while self.running:
@@ -124,9 +305,23 @@ class Gui():
                         game.whenAnArrowKeyIsPressed("Left")
                     elif event.key == pygame.K_RIGHT:
                         game.whenAnArrowKeyIsPressed("Right")
+                    elif event.key == pygame.K_F3:
+                        self.toggle_hud(profiler)
 
             handler.queueHandler()  #process any pending game events from the queue
+            self.update_hud(profiler)
+            profiling = profiler.enabled
+            if profiling:
+                begin = time.perf_counter()
             self.draw_game()    #redraw the game state
+            if profiling:
+                now = time.perf_counter()
+                profiler.record("draw", now - begin)
+                profiler.frameDone(now)
+                if handler.key_time is not None:
+                    #the tick that applied a key press is now on the screen
+                    profiler.record("key", now - handler.key_time)
+                    handler.key_time = None
             self.clock.tick(30) #control game frame rate
 
 
@@ -134,30 +329,46 @@ class QueueHandler():
     """
         This class implements the queue handler for the game.
     """
-    def __init__(self, queue, gui) -> None:
+    def __init__(self, queue, gui, profiler) -> None:
         self.queue = queue
         self.gui = gui
+        self.profiler = profiler
+        self.key_time = None  #key press applied by a tick that is not drawn yet
 
     def queueHandler(self) -> None:
         '''
             This method handles the queue by constantly retrieving
             tasks from it and accordingly taking the corresponding
             action.
-            A task could be: game_over, move, prey, score.
+            A task could be: game_over, move, view, prey, score.
             Each item in the queue is a dictionary whose key is
             the task type (for example, "move") and its value is
             the corresponding task value.
             If the queue.empty exception happens, it schedules 
             to call itself after a short delay.
+            While profiling, the move task of a tick carries a "profile"
+            stamp (tick, time put, time of the key press it applied).
         '''
+        profiling = self.profiler.enabled
         try:
             while not self.queue.empty():
                 task = self.queue.get_nowait()
+                if profiling and "profile" in task:
+                    tick, sent, key_time = task["profile"]
+                    self.profiler.record("queue", time.perf_counter() - sent, tick)
+                    #keep the first key press until its frame is drawn
+                    if self.key_time is None:
+                        self.key_time = key_time
                 if "game_over" in task:
                     self.gui.gameOver()
                     return
                 elif "move" in task:
                     self.gui.snakeIcon = task["move"]
+                elif "view" in task:
+                    #the part of a large board in the window; the segments are in no
+                    #particular order, so the window is drawn again from them
+                    self.gui.snakeIcon, self.gui.preyIcon = task["view"]
+                    self.gui.full_redraw = True
                 elif "prey" in task:
                     self.gui.preyIcon = task["prey"]
                 elif "score" in task:
@@ -168,29 +379,63 @@ class QueueHandler():
 
 class Game():
     '''
-        This class implements most of the game functionalities.
+        This class connects the game engine to the gui. The rules
+        themselves live in snake_engine.SnakeEngine; this class only
+        drives it in real time and turns its results into queue tasks.
     '''
         
-    def __init__(self) -> None:
+    def __init__(self, seed=None, recordTo=None, replayFrom=None, speed=1, autopilot=None,
+                 profileTo=None, world=None) -> None:
         """
-           This initializer sets the initial snake coordinate list, movement
-           direction, and arranges for the first prey to be created.
+           This initializer creates the engine from the GUI constants
+           and arranges for the first prey to be displayed.
+           With recordTo the session is saved to that file; with
+           replayFrom a saved session is played back instead, speed
+           times faster than real time. autopilot names a strategy of
+           snake_autopilot that steers the snake instead of the keys.
+           With profileTo the timings of every tick are saved to that
+           CSV file. world is (cols, rows) of a board larger than the
+           window, which is then seen through a camera following the head.
         """
         self.queue = gameQueue
-        self.score = 0
-        #starting length and location of the snake
-        #note that it is a list of tuples, each being an
-        #(x, y) tuple. Initially its size is 5 tuples. 
-        self.snakeCoordinates = [(495, 55), (485, 55), (475, 55), (465, 55), (455, 55)]
-        #initial direction of the snake
-        self.direction = "Left"
         self.gameNotOver = True
-        #initialize the attribute
-        self.prey_position = None
-        self.createNewPrey()
-        self._time_factor = 1
-        #this factor controls how fast the game goes
-        self._time_factor = 1    #this is set to 1 at first
+        self.speed = speed
+        self.recorder = None
+        self.player = None
+        self.profiler = TickProfiler(profileTo)
+        if replayFrom is not None:
+            #the recording brings its own seed and configuration
+            self.player = ReplayPlayer.load(replayFrom)
+            recorded = self.player.config
+            if recorded.windowWidth > WINDOW_WIDTH or recorded.windowHeight > WINDOW_HEIGHT:
+                #a board larger than the window keeps the snake in chunks, as with --world
+                self.player = ReplayPlayer.load(replayFrom, chunkCells=CHUNK_CELLS)
+            self.engine = self.player.engine
+            self.stepper = self.player.step
+        else:
+            if world is not None:
+                config = worldConfig(*world, snakeIconWidth=SNAKE_ICON_WIDTH,
+                                     preyIconWidth=PREY_ICON_WIDTH, movement=MOVEMENT)
+            else:
+                config = GameConfig(
+                    windowWidth=WINDOW_WIDTH, windowHeight=WINDOW_HEIGHT,
+                    snakeIconWidth=SNAKE_ICON_WIDTH, preyIconWidth=PREY_ICON_WIDTH,
+                    movement=MOVEMENT)
+            self.engine = SnakeEngine(config, seed)
+            self.stepper = self.engine.step
+            if recordTo is not None:
+                self.recorder = ReplayRecorder(self.engine)
+                self.recordTo = recordTo
+                self.stepper = self.recorder.step
+        self.autopilot = Autopilot(autopilot) if autopilot is not None and self.player is None else None
+        #only the part of a board larger than the window around the head is drawn
+        config = self.engine.config
+        self.camera = None
+        if config.windowWidth > WINDOW_WIDTH or config.windowHeight > WINDOW_HEIGHT:
+            self.camera = Camera(WINDOW_WIDTH, WINDOW_HEIGHT, config)
+            self.queue.put({'view': self.camera.view(self.engine)})
+        else:
+            self.queue.put({'prey': self.engine.prey_position})
         #to control the key press speed
         self.last_key_time = 0 
 
@@ -206,9 +451,8 @@ class Game():
         while self.gameNotOver:
             #call the move instance to get the sneak moving
             self.move()
-            #We can set fixed wait time between each move task is called
-            #later on we can change time factor so we can speed up or down the movements
-            time.sleep(SPEED*self._time_factor)
+            #the engine lowers its time factor each time the snake eats
+            time.sleep(SPEED*self.engine._time_factor/self.speed)
 
     def whenAnArrowKeyIsPressed(self, e) -> None:
         """ 
@@ -219,7 +463,6 @@ class Game():
 
             Had been modified for pygame.
         """
-        currentDirection = self.direction
         current_time = pygame.time.get_ticks() #get current time to prevent rapid direction changes
         key_delay = 10  #delay in milliseconds to prevent rapid direction changes
 
@@ -228,132 +471,58 @@ class Game():
             return
         self.last_key_time = current_time
 
-        #ignore invalid keys
-        if (currentDirection == "Left" and e == "Right" or 
-            currentDirection == "Right" and e == "Left" or
-            currentDirection == "Up" and e == "Down" or
-            currentDirection == "Down" and e == "Up"):
+        #a replay only follows the recorded directions
+        if self.player is not None:
             return
-        self.direction = e
+        direction = self.engine.direction
+        #the engine ignores turning back onto the body
+        self.engine.turn(e)
+        if self.profiler.enabled and self.engine.direction != direction:
+            self.profiler.keyPressed()
 
     def move(self) -> None:
         """ 
-            This method implements what is needed to be done
-            for the movement of the snake.
-            It generates a new snake coordinate. 
-            If based on this new movement, the prey has been 
-            captured, it adds a task to the queue for the updated
-            score and also creates a new prey.
-            It also calls a corresponding method to check if 
-            the game should be over. 
-            The snake coordinates list (representing its length 
-            and position) should be correctly updated.
+            This method steps the engine by one tick and adds the
+            corresponding tasks (score, prey, move or game_over)
+            to the queue.
         """
-        #NewSnakeCorrdinates has the snake head coordinates as a tuples
-        NewSnakeCoordinates = self.calculateNewCoordinates()
-        #complete the method implementation below
-        #first check if the agan is over if over inside the isGameOver will call gameover
-        self.isGameOver(NewSnakeCoordinates)
-
-        #game is not over yet
-        if self.gameNotOver:
-            #check to see if the snake has eat the prey
-            #that requrires snake location and prey location comparison
-            #express the snake head coordinates to head_x and head_y
-            x_head, y_head = NewSnakeCoordinates 
-            x1_prey, y1_prey, x2_prey, y2_prey = self.prey_position
-            #if the snake head is in the snake head location and the snake head is within the bound of the prey +/- half the SNAKE_ICON_WIDTH it will be consider captured
-            if (x1_prey-(SNAKE_ICON_WIDTH/2) <= x_head <= x2_prey+(SNAKE_ICON_WIDTH/2)) and (y1_prey-(SNAKE_ICON_WIDTH/2) <= y_head <= y2_prey+(SNAKE_ICON_WIDTH/2)):
-                #the snake has ate the prey
-                #so we need to make the snake longer 
-                self.snakeCoordinates.append(NewSnakeCoordinates)
-                #need to give snake a point
-                self.score += 1
-                #also need to let the game queue handler know to update the score too
-                self.queue.put({"score": self.score})    
-                #we need to call the next prey location       
-                self.createNewPrey()
-                #we increase the snake speed by 10% each time it has ate a prey 
-                if self._time_factor > 0.4:
-                    #if the time factor is > 40% then we increase the speed by 10% every time it ate.
-                    self._time_factor-=0.1
-            else:
-                #the sanek head has not ate the prey 
-                #so nothign happens aside from updating the snake corrdinates tuple list
-                #the head is at the last of the tuple list so append to the last
-                self.snakeCoordinates.append(NewSnakeCoordinates)
-                #remove the tail so pop the first
-                self.snakeCoordinates.pop(0)  
-            
-            #put the move task to the game handleing queue
-            self.queue.put({"move": self.snakeCoordinates})
-        else:
+        profiler = self.profiler
+        profiling = profiler.enabled
+        if self.autopilot is not None:
+            self.engine.turn(self.autopilot.decide(self.engine))
+        if profiling:
+            begin = time.perf_counter()
+        event = self.stepper()
+        if profiling:
+            now = time.perf_counter()
+            profiler.record("step", now - begin, self.engine.tick)
+            profiler.tickDone(now)
+        if event == GAME_OVER:
+            self.gameNotOver = False
+            self.saveRecording()
             #game over we need to let game queue handle know
             self.queue.put({"game_over": True})
+            return
+        if event == ATE:
+            self.queue.put({"score": self.engine.score})
+            if self.camera is None:
+                self.queue.put({"prey": self.engine.prey_position})
+        if self.camera is not None:
+            #only the segments in the window are sent, not the whole snake
+            task = {"view": self.camera.view(self.engine)}
+        else:
+            #put the move task to the game handleing queue
+            task = {"move": list(self.engine.snakeCoordinates)}
+        if profiling:
+            task["profile"] = (self.engine.tick, time.perf_counter(), profiler.takeKey())
+        self.queue.put(task)
 
-    def calculateNewCoordinates(self) -> tuple:
-        """
-            This method calculates and returns the new 
-            coordinates to be added to the snake
-            coordinates list based on the movement
-            direction and the current coordinate of 
-            head of the snake.
-            It is used by the move() method.    
-        """
-        lastX, lastY = self.snakeCoordinates[-1]
-        match self.direction:
-            case 'Up': new_x = lastX; new_y = lastY - MOVEMENT
-            case 'Down': new_x = lastX; new_y = lastY + MOVEMENT
-            case 'Left': new_x = lastX - MOVEMENT; new_y = lastY
-            case 'Right': new_x = lastX + MOVEMENT; new_y = lastY
-        return (new_x, new_y)
-
-    def isGameOver(self, snakeCoordinates) -> None:
-        """
-            This method checks if the game is over by 
-            checking if now the snake has passed any wall
-            or if it has bit itself.
-            If that is the case, it updates the gameNotOver 
-            field and also adds a "game_over" task to the queue. 
+    def saveRecording(self) -> None:
         """
-        x, y = snakeCoordinates
-        snake_die = False
-        if x > WINDOW_WIDTH or x < 0 or y > WINDOW_HEIGHT or y < 0:
-            snake_die = True
-        elif snakeCoordinates in self.snakeCoordinates:
-            snake_die = True
-        if snake_die:
-            self.gameNotOver = False
-            self.queue.put({'game_over': True})
-
-    def createNewPrey(self):
-        """ 
-            This methods picks an x and a y randomly as the coordinate 
-            of the new prey and uses that to calculate the 
-            coordinates (x - 5, y - 5, x + 5, y + 5). [you need to replace 5 with a constant]
-            It then adds a "prey" task to the queue with the calculated
-            rectangle coordinates as its value. This is used by the 
-            queue handler to represent the new prey.                    
-            To make playing the game easier, set the x and y to be THRESHOLD
-            away from the walls. 
+            This method writes the recorded session, if any, to its file.
         """
-        THRESHOLD = 15   #sets how close prey can be to borders
-        #this randomly generate prey in side the canvas and also not on the border. 
-        x=random.randint(THRESHOLD,WINDOW_WIDTH-THRESHOLD)
-        y=random.randint(THRESHOLD,WINDOW_HEIGHT-THRESHOLD)
-        #this ensures the randomly generate prey don't land on top of the snake
-        while (x,y) in self.snakeCoordinates:
-            #complete the method implementation 
-            x=random.randint(THRESHOLD,WINDOW_WIDTH-THRESHOLD)
-            y=random.randint(THRESHOLD,WINDOW_HEIGHT-THRESHOLD)
-        
-        #calcuate the rectangle coordinates
-        rectangleCoordinates=(x-(PREY_ICON_WIDTH/2),y-(PREY_ICON_WIDTH/2),x+(PREY_ICON_WIDTH/2),y+(PREY_ICON_WIDTH/2))
-        #we need the prey position to be know to other instances and this creay new prey does not even return anything
-        self.prey_position=rectangleCoordinates
-        
-        #add the prey task to the queue
-        self.queue.put({'prey':self.prey_position})
+        if self.recorder is not None:
+            self.recorder.save(self.recordTo)
 
 
 if __name__ == "__main__":
@@ -371,12 +540,54 @@ if __name__ == "__main__":
 
     gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
 
-    game = Game()        #instantiate the game object
+    #optionally record the session or play a recorded one back
+    parser = argparse.ArgumentParser(description="Snake game")
+    parser.add_argument("--seed", type=int, help="seed for the prey placement")
+    parser.add_argument("--record", metavar="FILE", help="save the session to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play the session saved in FILE")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed factor")
+    parser.add_argument("--autopilot", choices=STRATEGIES, help="let the computer play")
+    parser.add_argument("--hud", action="store_true", help="show the performance HUD (toggle with F3)")
+    parser.add_argument("--profile-csv", metavar="FILE", help="save the timings of every tick to FILE")
+    parser.add_argument("--world", metavar="COLSxROWS", help="play on a board of COLS x ROWS cells with a scrolling view")
+    args = parser.parse_args()
+    world = None
+    if args.world:
+        try:
+            world = tuple(int(size) for size in args.world.lower().split("x"))
+        except ValueError:
+            world = ()
+        if len(world) != 2 or min(world) < 2:
+            parser.error("--world expects the board size as COLSxROWS, for example 2000x1000")
+        try:
+            worldConfig(*world)
+        except ValueError as error:
+            parser.error(f"--world: {error}")
+        if args.autopilot:
+            parser.error("the autopilot plans over every cell and cannot be used with --world")
+    if args.speed <= 0:
+        parser.error("--speed must be greater than 0")
+    if args.replay:
+        #the recording brings its own seed, board and moves
+        ignored = [option for option, value in (("--seed", args.seed is not None), ("--record", args.record),
+                                                ("--autopilot", args.autopilot), ("--world", args.world))
+                   if value]
+        if ignored:
+            parser.error(f"--replay cannot be used with {', '.join(ignored)}")
+
+    game = Game(args.seed, args.record, args.replay, args.speed, args.autopilot,
+                args.profile_csv, world)        #instantiate the game object
 
     gui = Gui()    #instantiate the game user interface  
+    if args.hud:
+        gui.toggle_hud(game.profiler)
     
     #start a thread with the main loop of the game
     threading.Thread(target = game.superloop, daemon=True).start()
 
     #start the GUI's event loop
-    gui.main_loop(game)
\ No newline at end of file
+    gui.main_loop(game)
+
+    #keep the recording of a session that was closed before the game ended
+    game.saveRecording()
+    game.profiler.save()
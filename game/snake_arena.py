@@ -0,0 +1,356 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module implements the arena: hundreds of snakes steered by
+    agents, plus the local player, on one large board with many prey.
+
+    SnakeArena extends snake_net.SnakeMatch. Collisions between snakes and
+    with the prey are looked up by cell in two spatial hashes (occupiedBy
+    and preyCells), so the work of a tick grows with the number of snakes
+    and not with the number of pairs of them. A grid of one byte per cell
+    mirrors both hashes for the agents.
+
+    An agent decides with a breadth-first search from the head over a
+    bounded number of cells (decide). With workers the snakes are shared
+    out over worker processes (AgentPool) that read the grid from shared
+    memory, so only the heads and the chosen directions go through the
+    pipes. The decisions only depend on the grid, so a tick has the same
+    result with or without workers.
+
+    Run it as a script to measure ticks per second against the number of
+    snakes, with the agents in this process and in worker processes.
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+from snake_engine import SnakeEngine, GameConfig, DIRECTIONS
+from snake_net import SnakeMatch
+from snake_world import worldConfig
+
+#contents of a cell of the grid
+FREE, BODY, PREY = 0, 1, 2
+#cells a single decision may visit
+SEARCH_CELLS = 200
+#prey rectangle the engine is given when there is no prey ahead
+NO_PREY = (-100, -100, -100, -100)
+DIRECTION_NAMES = tuple(DIRECTIONS)
+
+
+def decide(grid, cols, rows, head, budget=SEARCH_CELLS) -> str:
+    """
+        This function returns the direction for a snake whose head is on
+        cell head: the first step towards the nearest prey that a
+        breadth-first search over at most budget cells finds or, when
+        there is none in reach, the first step with the most free cells
+        behind it. It returns None if every neighbour is blocked.
+    """
+    firstStep = {}  #cell -> index of the direction of the first step towards it
+    frontier = deque()
+    room = [0, 0, 0, 0]
+    col, row = head % cols, head//cols
+    for index, (dx, dy) in enumerate(DIRECTIONS.values()):
+        if 0 <= col + dx < cols and 0 <= row + dy < rows:
+            cell = head + dy*cols + dx
+            value = grid[cell]
+            if value == PREY:
+                return DIRECTION_NAMES[index]
+            if value == FREE:
+                firstStep[cell] = index
+                frontier.append(cell)
+    if not frontier:
+        return None
+    while frontier and len(firstStep) < budget:
+        cell = frontier.popleft()
+        step = firstStep[cell]
+        room[step] += 1
+        col = cell % cols
+        for neighbour in (cell - cols if cell >= cols else -1,
+                          cell + cols if cell + cols < cols*rows else -1,
+                          cell - 1 if col > 0 else -1,
+                          cell + 1 if col + 1 < cols else -1):
+            if neighbour < 0 or neighbour in firstStep:
+                continue
+            value = grid[neighbour]
+            if value == PREY:
+                return DIRECTION_NAMES[step]
+            if value == FREE:
+                firstStep[neighbour] = step
+                frontier.append(neighbour)
+    return DIRECTION_NAMES[max(set(firstStep.values()), key=room.__getitem__)]
+
+
+def _agentWorker(connection, name, cols, rows) -> None:
+    """
+        This function is the loop of a worker process of AgentPool. It
+        receives lists of (player id, head cell) and answers with lists of
+        (player id, direction) until it receives None.
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    grid = memory.buf
+    try:
+        while True:
+            heads = connection.recv()
+            if heads is None:
+                break
+            connection.send([(playerId, decide(grid, cols, rows, head)) for playerId, head in heads])
+    finally:
+        del grid
+        memory.close()
+
+
+class AgentPool():
+    '''
+        This class runs decide in worker processes. The grid lives in
+        shared memory; the arena writes it between ticks and the workers
+        only read it while the arena waits for their answers.
+    '''
+    def __init__(self, cols, rows, workers) -> None:
+        self.memory = shared_memory.SharedMemory(create=True, size=cols*rows)
+        self.grid = self.memory.buf
+        self.grid[:] = bytes(cols*rows)
+        self.connections = []
+        self.processes = []
+        for _ in range(workers):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_agentWorker, daemon=True,
+                                              args=(child, self.memory.name, cols, rows))
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def decideAll(self, heads) -> list:
+        """
+            This method returns (player id, direction) for a list of
+            (player id, head cell), each worker taking an equal share.
+        """
+        shares = len(self.connections)
+        for index, connection in enumerate(self.connections):
+            connection.send(heads[index::shares])
+        directions = []
+        for connection in self.connections:
+            directions.extend(connection.recv())
+        return directions
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
+        self.memory.close()
+        self.memory.unlink()
+
+
+class SnakeArena(SnakeMatch):
+    '''
+        This class runs an arena. Snakes spawn at random free places
+        instead of lanes, numPrey prey are on the board at a time, and
+        the snakes of agents are steered by steer(). With workers the
+        agents decide in that many worker processes.
+    '''
+    def __init__(self, config, seed=None, maxPlayers=1000, numPrey=100, respawnTicks=20,
+                 workers=0) -> None:
+        movement = config.movement
+        headX, headY = config.startCoordinates[-1]
+        self.originX = headX % movement
+        self.originY = headY % movement
+        self.cols = (config.windowWidth - self.originX)//movement + 1
+        self.rows = (config.windowHeight - self.originY)//movement + 1
+        self.pool = AgentPool(self.cols, self.rows, workers) if workers else None
+        self.grid = self.pool.grid if self.pool else bytearray(self.cols*self.rows)
+        self.numPrey = numPrey
+        self.preyCells = {}     #(x, y) -> prey rectangle of the prey on that cell
+        self.humans = set()     #players not steered by an agent
+        super().__init__(config, seed, maxPlayers, respawnTicks)
+
+    def cellOf(self, point) -> int:
+        return ((point[1] - self.originY)//self.config.movement)*self.cols + (point[0] - self.originX)//self.config.movement
+
+    def pointOf(self, cell) -> tuple:
+        row, col = divmod(cell, self.cols)
+        movement = self.config.movement
+        return (self.originX + col*movement, self.originY + row*movement)
+
+    def laneConfig(self, playerId) -> GameConfig:
+        """
+            This method returns the configuration of a new snake: five
+            segments in a random row or column, away from the walls.
+        """
+        config = self.config
+        movement = config.movement
+        direction = self.rng.choice(DIRECTION_NAMES)
+        dx, dy = DIRECTIONS[direction]
+        margin = 10
+        col = self.rng.randrange(margin, self.cols - margin)
+        row = self.rng.randrange(margin, self.rows - margin)
+        x, y = self.pointOf(row*self.cols + col)
+        start = [(x + dx*movement*index, y + dy*movement*index) for index in range(-4, 1)]
+        return GameConfig(config.windowWidth, config.windowHeight, config.snakeIconWidth,
+                          config.preyIconWidth, movement, config.threshold,
+                          start, direction)
+
+    def spawn(self, playerId) -> bool:
+        """
+            This method puts a new snake at a random place and returns False
+            if that place, or one of the five cells ahead of it, is taken.
+        """
+        config = self.laneConfig(playerId)
+        headX, headY = config.startCoordinates[-1]
+        dx, dy = DIRECTIONS[config.startDirection]
+        movement = config.movement
+        ahead = [(headX + dx*movement*index, headY + dy*movement*index) for index in range(1, 6)]
+        if any(point in self.occupiedBy or point in self.preyCells
+               for point in config.startCoordinates + ahead):
+            return False
+        engine = SnakeEngine(config, self.rng.randrange(2**63))
+        self.snakes[playerId] = engine
+        self.scores[playerId] = 0
+        for point in engine.snakeCoordinates:
+            self.occupy(point, playerId)
+        return True
+
+    def occupy(self, point, playerId) -> None:
+        self.occupiedBy[point] = playerId
+        self.grid[self.cellOf(point)] = BODY
+
+    def vacate(self, point) -> None:
+        del self.occupiedBy[point]
+        self.grid[self.cellOf(point)] = FREE
+
+    def preyAt(self, head) -> tuple:
+        return self.preyCells.get(head, NO_PREY)
+
+    def eat(self, head) -> None:
+        #the head is already on the cell of the prey in the grid
+        del self.preyCells[head]
+        self.createNewPrey()
+
+    def createNewPrey(self) -> None:
+        """
+            This method puts prey on random free cells until there are
+            numPrey of them.
+        """
+        half = self.config.preyIconWidth/2
+        randrange = self.rng.randrange
+        cells = self.cols*self.rows
+        while len(self.preyCells) < min(self.numPrey, cells - len(self.occupiedBy)):
+            cell = randrange(cells)
+            if self.grid[cell] == FREE:
+                x, y = self.pointOf(cell)
+                self.preyCells[(x, y)] = (x - half, y - half, x + half, y + half)
+                self.grid[cell] = PREY
+
+    def steer(self) -> None:
+        """
+            This method lets the agents turn their snakes for the next tick.
+        """
+        heads = [(playerId, self.cellOf(engine.snakeCoordinates[-1]))
+                 for playerId, engine in self.snakes.items() if playerId not in self.humans]
+        if self.pool is not None:
+            directions = self.pool.decideAll(heads)
+        else:
+            directions = [(playerId, decide(self.grid, self.cols, self.rows, head)) for playerId, head in heads]
+        for playerId, direction in directions:
+            if direction is not None:
+                self.snakes[playerId].turn(direction)
+
+    def visible(self, left, top, width, height) -> tuple:
+        """
+            This method returns ({player id: points}, prey centres) of the
+            snakes and prey in a window of the board, in window coordinates.
+            The cells of the window are looked up in the spatial hashes, so
+            the rest of the board is never looked at.
+        """
+        movement = self.config.movement
+        half = self.config.snakeIconWidth/2
+        firstCol = max(0, math.ceil((left - half - self.originX)/movement))
+        lastCol = min(self.cols - 1, int((left + width + half - self.originX)//movement))
+        firstRow = max(0, math.ceil((top - half - self.originY)/movement))
+        lastRow = min(self.rows - 1, int((top + height + half - self.originY)//movement))
+        players = set()
+        prey = []
+        occupiedBy, preyCells = self.occupiedBy, self.preyCells
+        for col in range(firstCol, lastCol + 1):
+            x = self.originX + col*movement
+            for row in range(firstRow, lastRow + 1):
+                point = (x, self.originY + row*movement)
+                playerId = occupiedBy.get(point)
+                if playerId is not None:
+                    players.add(playerId)
+                elif point in preyCells:
+                    prey.append((point[0] - left, point[1] - top))
+        snakes = {playerId: [(x - left, y - top) for x, y in self.snakes[playerId].snakeCoordinates]
+                  for playerId in players}
+        return snakes, prey
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.grid = None
+            self.pool.close()
+
+
+def newArena(numSnakes, seed=None, workers=0, cellsPerSnake=400, movement=15,
+             snakeIconWidth=15, preyIconWidth=15) -> SnakeArena:
+    """
+        This function returns an arena with numSnakes snakes on a square
+        board of about cellsPerSnake cells per snake and one prey for every
+        two snakes.
+    """
+    side = max(40, int(math.sqrt(numSnakes*cellsPerSnake)))
+    config = worldConfig(side, side, snakeIconWidth, preyIconWidth, movement)
+    arena = SnakeArena(config, seed, maxPlayers=numSnakes, numPrey=max(1, numSnakes//2),
+                       workers=workers)
+    for _ in range(numSnakes):
+        arena.addPlayer()
+    return arena
+
+
+def benchmark(counts=(50, 100, 200, 400), workerCounts=None, ticks=100, seed=0) -> list:
+    """
+        This function runs arenas of the given numbers of snakes with the
+        agents in this process (0 workers) and in worker processes, and
+        returns rows of (snakes, workers, ticks/s, ms steering, ms stepping
+        per tick).
+    """
+    if workerCounts is None:
+        workerCounts = (0, max(2, os.cpu_count() or 1))
+    results = []
+    for count in counts:
+        for workers in workerCounts:
+            arena = newArena(count, seed, workers)
+            try:
+                for _ in range(10):     #the snakes spawn and spread out
+                    arena.steer()
+                    arena.step()
+                steering = stepping = 0
+                for _ in range(ticks):
+                    begin = time.perf_counter()
+                    arena.steer()
+                    middle = time.perf_counter()
+                    arena.step()
+                    stepping += time.perf_counter() - middle
+                    steering += middle - begin
+            finally:
+                arena.close()
+            results.append((count, workers, ticks/(steering + stepping),
+                            1000*steering/ticks, 1000*stepping/ticks))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark arena ticks per second against the number of snakes")
+    parser.add_argument("--snakes", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--workers", type=int, nargs="+", help="worker processes to compare (0 is no pool)")
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'snakes':>6} {'workers':>7} {'ticks/s':>8} {'steer ms':>9} {'step ms':>8}")
+    for row in benchmark(args.snakes, args.workers, args.ticks):
+        print("{:>6} {:>7} {:>8.1f} {:>9.2f} {:>8.2f}".format(*row))
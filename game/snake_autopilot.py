@@ -0,0 +1,389 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module implements an autopilot that plays the snake game, for
+    demos, soak tests and as a baseline for the engine.
+
+    Two strategies are available:
+        greedy       shortest path (BFS) to the prey, taken only if the
+                     tail can still be reached from where the snake ends
+                     up; otherwise it chases its tail or heads for the
+                     largest open area.
+        hamiltonian  follows a Hamiltonian cycle of the board, taking
+                     shortcuts towards the prey while the snake is short
+                     enough that a shortcut cannot cut off its tail.
+
+    The autopilot keeps its own occupancy grid and updates it by one head
+    and at most one tail per tick. Every decision has a hard time budget;
+    the searches look at the clock every few cells and stop with a share
+    of the budget left, which the constant time cycle move (or any safe
+    move) then uses as the fallback.
+
+    Run it as a script to benchmark planning time against board size.
+"""
+
+import argparse
+import gc
+import time
+from collections import deque
+
+from snake_engine import SnakeEngine, GameConfig, DIRECTIONS, OPPOSITE, GAME_OVER
+
+STRATEGIES = ("greedy", "hamiltonian")
+#fastest tick of the game: SPEED times the smallest _time_factor
+FASTEST_TICK = 0.15*0.3
+#share of the budget kept for the fallback move when a search runs out of time
+FALLBACK_SHARE = 0.1
+#expansions between two looks at the clock
+CHECK_EVERY = 16
+
+
+class _OverBudget(Exception):
+    """
+        Raised inside a search when the time budget of the tick is used up.
+    """
+
+
+class Autopilot():
+    '''
+        This class decides the direction of the snake for each tick.
+    '''
+    def __init__(self, strategy="greedy", budget=FASTEST_TICK/10) -> None:
+        """
+            budget is the time in seconds a single decision may take.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.strategy = strategy
+        self.budget = budget
+        self.config = None
+        self.engine = None
+        self.tick = -1
+        self.overruns = 0
+
+    def setupBoard(self, config) -> None:
+        """
+            This method computes the grid of cells the head moves along,
+            the neighbours of every cell and a Hamiltonian cycle, once per
+            configuration.
+        """
+        self.config = config
+        movement = config.movement
+        headX, headY = config.startCoordinates[-1]
+        self.originX = headX % movement
+        self.originY = headY % movement
+        self.cols = cols = (config.windowWidth - self.originX)//movement + 1
+        self.rows = rows = (config.windowHeight - self.originY)//movement + 1
+        numCells = cols*rows
+        self.neighbours = []
+        for cell in range(numCells):
+            col, row = cell % cols, cell//cols
+            cellNeighbours = []
+            for name, (dx, dy) in DIRECTIONS.items():
+                if 0 <= col + dx < cols and 0 <= row + dy < rows:
+                    cellNeighbours.append((cell + dy*cols + dx, name))
+            self.neighbours.append(tuple(cellNeighbours))
+        #search scratch space, reused by every search thanks to the stamp
+        self.seen = [0]*numCells
+        self.parent = [0]*numCells
+        self.stamp = 0
+        self.cycleOrder, self.cycleNext = self.buildCycle(cols, rows)
+
+    @staticmethod
+    def buildCycle(cols, rows) -> tuple:
+        """
+            This method returns (position of each cell on the cycle, next
+            cell on the cycle), or (None, None) if both sides are odd and
+            no Hamiltonian cycle exists.
+        """
+        transpose = rows % 2 == 1
+        if transpose and cols % 2 == 1 or cols < 2 or rows < 2:
+            return None, None
+        width, height = (rows, cols) if transpose else (cols, rows)
+        #snake through the rows leaving column 0 free, then come back up column 0
+        path = []
+        for row in range(height):
+            columns = range(1, width) if row % 2 == 0 else range(width - 1, 0, -1)
+            path.extend((col, row) for col in columns)
+        path.extend((0, row) for row in range(height - 1, -1, -1))
+        cells = [(row*cols + col) if not transpose else (col*cols + row) for col, row in path]
+        order = [0]*len(cells)
+        following = [0]*len(cells)
+        for position, cell in enumerate(cells):
+            order[cell] = position
+            following[cell] = cells[(position + 1) % len(cells)]
+        return order, following
+
+    def cellOf(self, point) -> int:
+        """
+            This method returns the cell of a point, or -1 if the point is
+            not on the grid (like the first segments of the starting snake).
+        """
+        col, colRest = divmod(point[0] - self.originX, self.config.movement)
+        row, rowRest = divmod(point[1] - self.originY, self.config.movement)
+        if colRest or rowRest or not (0 <= col < self.cols and 0 <= row < self.rows):
+            return -1
+        return row*self.cols + col
+
+    def sync(self, engine) -> None:
+        """
+            This method brings the occupancy grid up to date with the engine,
+            normally by adding the new head and removing the old tail.
+        """
+        if engine.config is not self.config:
+            self.setupBoard(engine.config)
+        if engine is self.engine and engine.tick == self.tick:
+            return
+        if engine is self.engine and engine.tick == self.tick + 1:
+            self.body.append(self.cellOf(engine.snakeCoordinates[-1]))
+            self.blocked[self.body[-1]] = 1
+            if len(self.body) > len(engine.snakeCoordinates):
+                tail = self.body.popleft()
+                if tail >= 0:
+                    self.blocked[tail] = 0
+        else:
+            #first tick or a new game: build the grid from scratch
+            self.engine = engine
+            self.body = deque(self.cellOf(point) for point in engine.snakeCoordinates)
+            self.blocked = bytearray(self.cols*self.rows)
+            for cell in self.body:
+                if cell >= 0:
+                    self.blocked[cell] = 1
+        self.tick = engine.tick
+
+    def decide(self, engine) -> str:
+        """
+            This method returns the direction to take on the next tick.
+        """
+        self.sync(engine)
+        #the searches stop early enough to leave time for the fallback move
+        deadline = time.perf_counter() + self.budget*(1 - FALLBACK_SHARE)
+        try:
+            if self.strategy == "greedy":
+                return self.greedyMove(engine, deadline)
+            return self.cycleMove(engine)
+        except _OverBudget:
+            self.overruns += 1
+            return self.cycleMove(engine)
+
+    def legalMoves(self, engine) -> list:
+        """
+            This method returns the (cell, direction) pairs the head can
+            move to without dying on this tick.
+        """
+        reverse = OPPOSITE[engine.direction]
+        return [(cell, name) for cell, name in self.neighbours[self.body[-1]]
+                if not self.blocked[cell] and name != reverse]
+
+    def preyCells(self, engine) -> set:
+        """
+            This method returns the free cells where the head captures the prey.
+        """
+        config = self.config
+        x1, y1, x2, y2 = engine.prey_position
+        half = config.snakeIconWidth/2
+        movement = config.movement
+        firstCol = max(0, -int(-(x1 - half - self.originX)//movement))
+        lastCol = min(self.cols - 1, int((x2 + half - self.originX)//movement))
+        firstRow = max(0, -int(-(y1 - half - self.originY)//movement))
+        lastRow = min(self.rows - 1, int((y2 + half - self.originY)//movement))
+        return {row*self.cols + col
+                for row in range(firstRow, lastRow + 1)
+                for col in range(firstCol, lastCol + 1)
+                if not self.blocked[row*self.cols + col]}
+
+    def search(self, start, goals, deadline, firstMoves=None) -> list:
+        """
+            This method runs a breadth first search from start through free
+            cells and returns the path (without start) to the closest goal,
+            or None. Goals may be occupied cells, like the tail.
+        """
+        self.stamp += 1
+        stamp, seen, parent, blocked = self.stamp, self.seen, self.parent, self.blocked
+        neighbours = self.neighbours
+        seen[start] = stamp
+        frontier = deque()
+        for cell, _ in (firstMoves if firstMoves is not None else neighbours[start]):
+            if seen[cell] == stamp:
+                continue
+            seen[cell] = stamp
+            parent[cell] = start
+            if cell in goals:
+                return [cell]
+            if not blocked[cell]:
+                frontier.append(cell)
+        expanded = 0
+        while frontier:
+            current = frontier.popleft()
+            expanded += 1
+            if expanded % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                raise _OverBudget
+            for cell, _ in neighbours[current]:
+                if seen[cell] != stamp:
+                    seen[cell] = stamp
+                    parent[cell] = current
+                    if cell in goals:
+                        path = [cell]
+                        while parent[path[-1]] != start:
+                            path.append(parent[path[-1]])
+                        path.reverse()
+                        return path
+                    if not blocked[cell]:
+                        frontier.append(cell)
+        return None
+
+    def tailReachableAfter(self, path, grows, deadline) -> bool:
+        """
+            This method checks that after following path the head could
+            still reach the tail. The grid is changed to the position at the
+            end of the path for the check and then put back.
+        """
+        if time.perf_counter() > deadline:
+            raise _OverBudget
+        blocked = self.blocked
+        body = list(self.body) + path
+        removed = len(path) - (1 if grows else 0)
+        vacated = [cell for cell in body[:removed] if cell >= 0]
+        tail = next(cell for cell in body[removed:] if cell >= 0)
+        for cell in path:
+            blocked[cell] = 1
+        for cell in vacated:
+            blocked[cell] = 0
+        try:
+            return self.search(path[-1], (tail,), deadline) is not None
+        finally:
+            for cell in vacated:
+                blocked[cell] = 1
+            for cell in path:
+                blocked[cell] = 0
+
+    def greedyMove(self, engine, deadline) -> str:
+        """
+            This method heads for the prey along the shortest safe path, or
+            chases its tail, or moves towards the largest open area.
+        """
+        moves = self.legalMoves(engine)
+        if not moves:
+            return engine.direction
+        directionOf = {cell: name for cell, name in moves}
+        goals = self.preyCells(engine)
+        path = self.search(self.body[-1], goals, deadline, moves) if goals else None
+        if path is not None and self.tailReachableAfter(path, True, deadline):
+            return directionOf[path[0]]
+        tail = next(cell for cell in self.body if cell >= 0)
+        path = self.search(self.body[-1], (tail,), deadline, moves)
+        #stepping straight onto the tail is a collision, so keep some distance
+        if path is not None and len(path) > 1 and self.tailReachableAfter(path[:1], False, deadline):
+            return directionOf[path[0]]
+        return self.roomiestMove(moves, deadline)
+
+    def roomiestMove(self, moves, deadline) -> str:
+        """
+            This method returns the move leading to the most free cells.
+        """
+        best, bestRoom = moves[0][1], -1
+        for cell, name in moves:
+            if time.perf_counter() > deadline:
+                raise _OverBudget
+            self.stamp += 1
+            stamp, seen, blocked, neighbours = self.stamp, self.seen, self.blocked, self.neighbours
+            seen[cell] = stamp
+            frontier = [cell]
+            room = 0
+            while frontier:
+                current = frontier.pop()
+                room += 1
+                if room % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                    raise _OverBudget
+                for neighbour, _ in neighbours[current]:
+                    if seen[neighbour] != stamp and not blocked[neighbour]:
+                        seen[neighbour] = stamp
+                        frontier.append(neighbour)
+            if room > bestRoom:
+                best, bestRoom = name, room
+        return best
+
+    def cycleMove(self, engine) -> str:
+        """
+            This method follows the Hamiltonian cycle, taking the legal move
+            that gets closest to the prey along the cycle without passing
+            the tail. It runs in constant time.
+        """
+        moves = self.legalMoves(engine)
+        if not moves:
+            return engine.direction
+        order = self.cycleOrder
+        if order is None:
+            return moves[0][1]
+        numCells = len(order)
+        head = self.body[-1]
+        tail = next(cell for cell in self.body if cell >= 0)
+        headOrder = order[head]
+        toTail = (order[tail] - headOrder) % numCells
+        goals = self.preyCells(engine)
+        target = min(goals, key=lambda cell: (order[cell] - headOrder) % numCells) if goals else None
+        #shortcuts are only safe while the snake fills less than half the board
+        shortcuts = len(self.body) < numCells//2
+        best, bestDistance = None, None
+        for cell, name in moves:
+            ahead = (order[cell] - headOrder) % numCells
+            if ahead >= toTail or (ahead != 1 and not shortcuts):
+                continue
+            distance = (order[target] - order[cell]) % numCells if target is not None else ahead
+            if bestDistance is None or distance < bestDistance:
+                best, bestDistance = name, distance
+        if best is None:
+            successor = self.cycleNext[head]
+            best = next((name for cell, name in moves if cell == successor), moves[0][1])
+        return best
+
+
+def benchmark(sizes=(10, 20, 40, 80), games=3, maxTicks=3000, budget=FASTEST_TICK/10) -> list:
+    """
+        This function plays games on square boards of the given number of
+        cells per side with each strategy and returns rows of
+        (strategy, cells, mean ms, p99 ms, max ms, overruns, mean score).
+    """
+    results = []
+    for size in sizes:
+        movement = 15
+        config = GameConfig(windowWidth=5 + movement*(size - 1), windowHeight=10 + movement*(size - 1),
+                            startCoordinates=[(5 + movement*i, 10) for i in range(5)],
+                            startDirection="Right")
+        for strategy in STRATEGIES:
+            times, scores, overruns = [], [], 0
+            for seed in range(games):
+                engine = SnakeEngine(config, seed)
+                pilot = Autopilot(strategy, budget)
+                #the grid is built once per board, outside the timed ticks
+                pilot.sync(engine)
+                #keep garbage collection pauses out of the planning times
+                gc.collect()
+                gc.disable()
+                try:
+                    while engine.tick < maxTicks:
+                        start = time.perf_counter()
+                        direction = pilot.decide(engine)
+                        times.append(time.perf_counter() - start)
+                        if engine.step(direction) == GAME_OVER:
+                            break
+                finally:
+                    gc.enable()
+                scores.append(engine.score)
+                overruns += pilot.overruns
+            times.sort()
+            results.append((strategy, size*size, 1000*sum(times)/len(times),
+                            1000*times[int(0.99*(len(times) - 1))], 1000*times[-1],
+                            overruns, sum(scores)/len(scores)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark autopilot planning time against board size")
+    parser.add_argument("--budget", type=float, default=FASTEST_TICK/10, help="seconds per decision")
+    parser.add_argument("--games", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'strategy':<12} {'cells':>6} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'overruns':>9} {'score':>7}")
+    for row in benchmark(games=args.games, budget=args.budget):
+        print("{:<12} {:>6} {:>8.3f} {:>8.3f} {:>8.3f} {:>9} {:>7.1f}".format(*row))
@@ -0,0 +1,243 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module implements a batch of snake games stored as NumPy arrays
+    and stepped together with one vectorized call. It follows the same
+    rules as snake_engine.SnakeEngine (movement, wall and self collision,
+    prey capture and growth) and restarts each game as soon as it is over.
+
+    Run it as a script to benchmark steps/sec as the number of games grows.
+"""
+
+import time
+
+import numpy as np
+
+from snake_engine import GameConfig, DIRECTIONS, OPPOSITE, MOVED, ATE, GAME_OVER
+
+#direction codes used by the batch, in the order of snake_engine.DIRECTIONS
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTIONS)}
+NO_ACTION = -1
+_OPPOSITE_CODE = np.array([DIRECTION_CODES[OPPOSITE[name]] for name in DIRECTIONS], dtype=np.int8)
+_DX = np.array([DIRECTIONS[name][0] for name in DIRECTIONS], dtype=np.int32)
+_DY = np.array([DIRECTIONS[name][1] for name in DIRECTIONS], dtype=np.int32)
+
+
+class BatchSnakeEnv():
+    '''
+        This class runs numGames snake games side by side.
+        The head of the snake always moves on a lattice of MOVEMENT sized
+        cells anchored at the starting head, so every board is stored as a
+        flat boolean occupancy array of those cells and every body as a
+        ring buffer of cell indices. Starting segments that are not on the
+        lattice (the default snake is spaced 10 pixels apart) can never be
+        reached by the head, so they are kept in the ring as -1.
+    '''
+    def __init__(self, numGames, config=None, seed=None) -> None:
+        """
+            The initializer allocates the arrays for all games and starts
+            every game from the starting snake.
+        """
+        self.config = config if config is not None else GameConfig()
+        config = self.config
+        self.numGames = numGames
+        self.rng = np.random.default_rng(seed)
+
+        #lattice geometry, anchored at the starting head
+        movement = config.movement
+        headX, headY = config.startCoordinates[-1]
+        self.originX = headX % movement
+        self.originY = headY % movement
+        self.cols = (config.windowWidth - self.originX)//movement + 1
+        self.rows = (config.windowHeight - self.originY)//movement + 1
+        numCells = self.cols*self.rows
+        #the head is captured within half a prey plus half a snake icon
+        self.captureRadius = config.preyIconWidth/2 + config.snakeIconWidth/2
+
+        #starting snake as lattice cells (-1 when off the lattice)
+        startX = np.array([x for x, _ in config.startCoordinates], dtype=np.int32)
+        startY = np.array([y for _, y in config.startCoordinates], dtype=np.int32)
+        onLattice = ((startX - self.originX) % movement == 0) & ((startY - self.originY) % movement == 0)
+        startCells = ((startY - self.originY)//movement)*self.cols + (startX - self.originX)//movement
+        self.startX, self.startY = startX, startY
+        self.startCells = np.where(onLattice, startCells, -1).astype(np.int32)
+        self.startLatticeCells = self.startCells[self.startCells >= 0]
+        self.startDirection = DIRECTION_CODES[config.startDirection]
+
+        #per game state
+        self.capacity = numCells + len(startX)
+        self.board = np.zeros((numGames, numCells), dtype=bool)
+        self.body = np.zeros((numGames, self.capacity), dtype=np.int32)
+        self.tail = np.zeros(numGames, dtype=np.int64)
+        self.length = np.zeros(numGames, dtype=np.int64)
+        self.headCol = np.zeros(numGames, dtype=np.int32)
+        self.headRow = np.zeros(numGames, dtype=np.int32)
+        self.direction = np.zeros(numGames, dtype=np.int8)
+        self.score = np.zeros(numGames, dtype=np.int32)
+        #number of starting segments not yet popped from the tail
+        self.startLeft = np.zeros(numGames, dtype=np.int32)
+        self.preyX = np.zeros(numGames, dtype=np.int32)
+        self.preyY = np.zeros(numGames, dtype=np.int32)
+        #score of the last finished game in each slot
+        self.finalScore = np.zeros(numGames, dtype=np.int32)
+        self.gamesFinished = 0
+        self._all = np.arange(numGames)
+        self.resetGames(self._all)
+
+    def resetGames(self, games) -> None:
+        """
+            This method restarts the given games from the starting snake
+            and places a new prey for each of them.
+        """
+        if games.size == 0:
+            return
+        numStart = len(self.startCells)
+        self.board[games] = False
+        self.board[games[:, None], self.startLatticeCells[None, :]] = True
+        self.body[games, :numStart] = self.startCells
+        self.tail[games] = 0
+        self.length[games] = numStart
+        headCell = self.startCells[-1]
+        self.headCol[games] = headCell % self.cols
+        self.headRow[games] = headCell//self.cols
+        self.direction[games] = self.startDirection
+        self.score[games] = 0
+        self.startLeft[games] = numStart
+        self.createNewPrey(games)
+
+    def createNewPrey(self, games) -> None:
+        """
+            This method picks a random prey centre for each of the given
+            games at least threshold away from the walls, redrawing the
+            games whose prey landed exactly on their snake.
+        """
+        config = self.config
+        threshold = config.threshold
+        pending = games
+        while pending.size:
+            x = self.rng.integers(threshold, config.windowWidth - threshold, size=pending.size, endpoint=True)
+            y = self.rng.integers(threshold, config.windowHeight - threshold, size=pending.size, endpoint=True)
+            self.preyX[pending] = x
+            self.preyY[pending] = y
+            pending = pending[self._isOnSnake(pending, x, y)]
+
+    def _isOnSnake(self, games, x, y) -> np.ndarray:
+        """
+            This method returns which of the points (x, y) lie exactly on
+            a segment of the snake of the corresponding game.
+        """
+        movement = self.config.movement
+        col, colRest = np.divmod(x - self.originX, movement)
+        row, rowRest = np.divmod(y - self.originY, movement)
+        valid = ((colRest == 0) & (rowRest == 0) & (col >= 0) & (col < self.cols)
+                 & (row >= 0) & (row < self.rows))
+        hit = np.zeros(games.size, dtype=bool)
+        hit[valid] = self.board[games[valid], (row*self.cols + col)[valid]]
+        #starting segments still in the body, including those off the lattice
+        numStart = len(self.startCells)
+        present = np.arange(numStart)[None, :] >= (numStart - self.startLeft[games])[:, None]
+        onStart = (x[:, None] == self.startX[None, :]) & (y[:, None] == self.startY[None, :])
+        return hit | (onStart & present).any(axis=1)
+
+    def step(self, actions=None) -> np.ndarray:
+        """
+            This method advances every game by one tick.
+            actions is an optional array of direction codes (NO_ACTION keeps
+            the current direction); turning straight back is ignored.
+            It returns an array of MOVED, ATE or GAME_OVER for each game.
+            Games that end are recorded in finalScore and restarted.
+        """
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int8)
+            turn = (actions >= 0) & (actions != _OPPOSITE_CODE[self.direction])
+            self.direction = np.where(turn, actions, self.direction)
+        col = self.headCol + _DX[self.direction]
+        row = self.headRow + _DY[self.direction]
+        cell = row*self.cols + col
+
+        #wall collision first, then self collision against the whole body
+        wall = (col < 0) | (col >= self.cols) | (row < 0) | (row >= self.rows)
+        dead = wall | self.board[self._all, np.where(wall, 0, cell)]
+        events = np.where(dead, GAME_OVER, MOVED).astype(np.int8)
+
+        #move the head of every surviving snake
+        alive = np.flatnonzero(~dead)
+        headCell = cell[alive]
+        self.body[alive, (self.tail[alive] + self.length[alive]) % self.capacity] = headCell
+        self.board[alive, headCell] = True
+        self.length[alive] += 1
+        self.headCol[alive] = col[alive]
+        self.headRow[alive] = row[alive]
+
+        #prey capture grows the snake, otherwise the tail moves along
+        headX = self.originX + self.config.movement*col[alive]
+        headY = self.originY + self.config.movement*row[alive]
+        ate = ((np.abs(headX - self.preyX[alive]) <= self.captureRadius)
+               & (np.abs(headY - self.preyY[alive]) <= self.captureRadius))
+        eaters = alive[ate]
+        events[eaters] = ATE
+        self.score[eaters] += 1
+        self.createNewPrey(eaters)
+
+        movers = alive[~ate]
+        tail = self.tail[movers]
+        oldCell = self.body[movers, tail]
+        onBoard = oldCell >= 0
+        self.board[movers[onBoard], oldCell[onBoard]] = False
+        self.tail[movers] = (tail + 1) % self.capacity
+        self.length[movers] -= 1
+        self.startLeft[movers] = np.maximum(self.startLeft[movers] - 1, 0)
+
+        #record and restart the games that are over
+        over = np.flatnonzero(dead)
+        self.finalScore[over] = self.score[over]
+        self.gamesFinished += over.size
+        self.resetGames(over)
+        return events
+
+    def snakeCoordinates(self, game) -> list:
+        """
+            This method returns the snake of one game as a list of (x, y)
+            tuples with the head last, like SnakeEngine.snakeCoordinates.
+        """
+        movement = self.config.movement
+        index = (self.tail[game] + np.arange(self.length[game])) % self.capacity
+        numStart = len(self.startCells)
+        coordinates = []
+        for position, cell in enumerate(self.body[game, index]):
+            if position < self.startLeft[game]:
+                start = numStart - self.startLeft[game] + position
+                coordinates.append((int(self.startX[start]), int(self.startY[start])))
+            else:
+                coordinates.append((int(self.originX + movement*(cell % self.cols)),
+                                    int(self.originY + movement*(cell//self.cols))))
+        return coordinates
+
+
+def benchmark(sizes=(1, 16, 256, 4096, 16384), seconds=1.0, seed=0) -> list:
+    """
+        This function steps batches of increasing size with random actions
+        and returns (numGames, steps/sec) for each size.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for numGames in sizes:
+        env = BatchSnakeEnv(numGames, seed=seed)
+        #keep the current direction most of the time so games last a while
+        actions = np.where(rng.random((64, numGames)) < 0.2,
+                           rng.integers(0, len(DIRECTIONS), (64, numGames)), NO_ACTION)
+        ticks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            env.step(actions[ticks % 64])
+            ticks += 1
+        elapsed = time.perf_counter() - start
+        results.append((numGames, numGames*ticks/elapsed))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'games':>8} {'steps/sec':>14} {'steps/sec/game':>15}")
+    for numGames, rate in benchmark():
+        print(f"{numGames:>8} {rate:>14,.0f} {rate/numGames:>15,.0f}")
@@ -0,0 +1,419 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module benchmarks the snake engine and both frontends and writes
+    the results as JSON, with percentiles in microseconds, so that runs
+    before and after a change can be compared.
+
+    It measures:
+        engine_step         SnakeEngine.step against snake length
+        game_move           Game.move of the Tk frontend (step plus queue
+                            tasks) against snake length
+        create_new_prey     SnakeEngine.createNewPrey and its number of draws
+                            against board fill
+        queue               enqueue to dequeue delay of the Game.move tasks
+                            at the fastest tick with the Tk poll delay, and
+                            the throughput of the queue when saturated
+        render_tk           one frame of the Tk canvas frontend (SegmentRenderer)
+        render_pygame       one frame of Gui.draw_game and of a full redraw
+        world_view          step plus camera view on boards of growing size,
+                            and the memory the engine uses there
+
+    The renderers need a display. pygame uses its dummy video driver when
+    there is none; run Tk under a virtual display (for example xvfb-run),
+    otherwise it is reported as skipped.
+
+        python snake_bench.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from snake_engine import SnakeEngine, GameConfig, GAME_OVER
+from snake_autopilot import Autopilot, FASTEST_TICK
+from snake_world import Camera, worldConfig
+
+#constants the frontends expect to find as module globals
+FRONTEND_CONSTANTS = dict(WINDOW_WIDTH=500, WINDOW_HEIGHT=300, SNAKE_ICON_WIDTH=15,
+                          PREY_ICON_WIDTH=15, MOVEMENT=15, BACKGROUND_COLOUR="black",
+                          ICON_COLOUR="yellow", OTHER_ICON_COLOUR="deep sky blue")
+
+
+def summarize(samples) -> dict:
+    """
+        This function returns count, mean and percentiles (in microseconds)
+        of a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def percentile(fraction):
+        return round(ordered[int(fraction*last)]*1e6, 3)
+
+    return {"count": len(ordered), "mean_us": round(sum(ordered)/len(ordered)*1e6, 3),
+            "p50_us": percentile(0.5), "p90_us": percentile(0.9),
+            "p99_us": percentile(0.99), "max_us": round(ordered[-1]*1e6, 3)}
+
+
+def serpentineConfig(length, cols, rows, movement=15, originX=5, originY=10) -> GameConfig:
+    """
+        This function returns a configuration on a cols x rows board whose
+        starting snake of the given length is folded row by row from the
+        top, with the head last.
+    """
+    points = []
+    for index in range(length):
+        row, col = divmod(index, cols)
+        if row % 2 == 1:
+            col = cols - 1 - col
+        points.append((originX + movement*col, originY + movement*row))
+    lastRow = (length - 1)//cols
+    return GameConfig(windowWidth=originX + movement*(cols - 1),
+                      windowHeight=originY + movement*(rows - 1),
+                      startCoordinates=points, startDirection="Down" if lastRow + 1 < rows else "Right")
+
+
+def benchEngineStep(lengths=(5, 50, 500, 5000), batches=300, stepsPerBatch=20) -> dict:
+    """
+        This function times SnakeEngine.step for snakes of several lengths.
+        Each sample is a batch of steps straight down into free rows, after
+        which the engine is restored; the prey is kept out of reach.
+    """
+    results = {}
+    for length in lengths:
+        cols = 100
+        config = serpentineConfig(length, cols, length//cols + stepsPerBatch + 2)
+        engine = SnakeEngine(config, 0)
+        engine.direction = "Down"
+        engine.prey_position = (-100, -100, -100, -100)
+        start = engine.snapshot()
+        samples = []
+        for _ in range(batches):
+            engine.restore(start)
+            begin = time.perf_counter()
+            for _ in range(stepsPerBatch):
+                engine.step()
+            samples.append((time.perf_counter() - begin)/stepsPerBatch)
+        assert engine.gameNotOver
+        results[str(length)] = summarize(samples)
+    return results
+
+
+def loadFrontend(name):
+    """
+        This function imports a frontend module and gives it the constants
+        and the queue that its __main__ block would normally create.
+    """
+    module = __import__(name)
+    for key, value in FRONTEND_CONSTANTS.items():
+        setattr(module, key, value)
+    module.gameQueue = queue.Queue()
+    return module
+
+
+def benchGameMove(lengths=(5, 50, 500), batches=300, stepsPerBatch=20) -> dict:
+    """
+        This function times Game.move of the Tk frontend, which steps the
+        engine and puts the advance task (only the new head) on the queue,
+        so its cost should not grow with the length of the snake.
+    """
+    frontend = loadFrontend("part1_snake")
+    results = {}
+    for length in lengths:
+        game = frontend.Game(seed=0)
+        config = serpentineConfig(length, 100, length//100 + stepsPerBatch + 2)
+        game.engine = SnakeEngine(config, 0)
+        game.stepper = game.engine.step
+        game.engine.prey_position = (-100, -100, -100, -100)
+        start = game.engine.snapshot()
+        samples = []
+        for _ in range(batches):
+            game.engine.restore(start)
+            begin = time.perf_counter()
+            for _ in range(stepsPerBatch):
+                game.move()
+            samples.append((time.perf_counter() - begin)/stepsPerBatch)
+            game.queue.queue.clear()
+        results[str(length)] = summarize(samples)
+    return results
+
+
+def benchCreateNewPrey(fills=(0.0, 0.25, 0.5, 0.75, 0.95), samples=2000) -> dict:
+    """
+        This function times createNewPrey on the default board with the
+        given fraction of the prey centres it can draw occupied, and counts
+        how many centres it draws per prey.
+    """
+    results = {}
+    config = GameConfig()
+    threshold = config.threshold
+    #createNewPrey draws every integer point in this range, not only the grid points
+    centres = [(x, y) for x in range(threshold, config.windowWidth - threshold + 1)
+               for y in range(threshold, config.windowHeight - threshold + 1)]
+    random.Random(0).shuffle(centres)
+    for fill in fills:
+        engine = SnakeEngine(config, 0)
+        engine.occupied = set(centres[:int(fill*len(centres))]) | set(engine.snakeCoordinates)
+        times = []
+        for _ in range(samples):
+            begin = time.perf_counter()
+            engine.createNewPrey()
+            times.append(time.perf_counter() - begin)
+        #a second pass counts the draws, which would slow down the timed one
+        draws = [0]
+        randint = engine.rng.randint
+
+        def countingRandint(low, high):
+            draws[0] += 1
+            return randint(low, high)
+        engine.rng.randint = countingRandint
+        for _ in range(samples):
+            engine.createNewPrey()
+        results[f"{fill:.2f}"] = dict(summarize(times), mean_draws=round(draws[0]/2/samples, 2))
+    return results
+
+
+class StampedQueue(queue.Queue):
+    """
+        This class is a queue that keeps the time each task was put, so the
+        tasks Game.move puts can be timed without changing them.
+    """
+    def put(self, item, block=True, timeout=None) -> None:
+        super().put((time.perf_counter(), item), block, timeout)
+
+
+def benchQueue(length=100, ticks=100, tick=FASTEST_TICK, pollDelay=0.1, tasks=50000,
+               stepsPerBatch=20) -> dict:
+    """
+        This function sends the tasks Game.move of the Tk frontend puts to
+        a consumer that drains the queue like QueueHandler. The paced run
+        moves the game once per tick and drains every pollDelay seconds,
+        and reports the delay between put and get the handler sees; the
+        saturated run moves as fast as it can and reports the throughput.
+    """
+    frontend = loadFrontend("part1_snake")
+    game = frontend.Game(seed=0)
+    game.engine = SnakeEngine(serpentineConfig(length, 100, length//100 + stepsPerBatch + 2), 0)
+    game.stepper = game.engine.step
+    game.engine.prey_position = (-100, -100, -100, -100)
+    game.queue = StampedQueue()
+    start = game.engine.snapshot()
+
+    def move(index):
+        if index % stepsPerBatch == 0:
+            game.engine.restore(start)
+        game.move()
+
+    def consume(moves, delays, wait):
+        #the prey is out of reach, so every move puts exactly one task
+        received = 0
+        while received < moves:
+            try:
+                while True:
+                    sent, task = game.queue.get_nowait()
+                    delays.append(time.perf_counter() - sent)
+                    game.queue.task_done()
+                    received += 1
+            except queue.Empty:
+                time.sleep(wait)
+
+    def produce(moves, interval):
+        due = time.perf_counter()
+        for index in range(moves):
+            move(index)
+            due += interval
+            if interval:
+                time.sleep(max(0, due - time.perf_counter()))
+
+    delays = []
+    producer = threading.Thread(target=produce, args=(ticks, tick), daemon=True)
+    producer.start()
+    consume(ticks, delays, pollDelay)
+    producer.join()
+
+    consumer = threading.Thread(target=consume, args=(tasks, [], 0.0005), daemon=True)
+    begin = time.perf_counter()
+    consumer.start()
+    produce(tasks, 0)
+    consumer.join()
+    elapsed = time.perf_counter() - begin
+    return {"delay": summarize(delays), "saturated_tasks_per_sec": round(tasks/elapsed, 1)}
+
+
+def framesOfPlay(frames, length):
+    """
+        This function yields (snake, prey, score) for frames of an
+        autopilot game on the default board, starting from a snake of the
+        given length.
+    """
+    config = serpentineConfig(length, 34, 20)
+    engine = SnakeEngine(config, 0)
+    pilot = Autopilot("hamiltonian")
+    for _ in range(frames):
+        if engine.step(pilot.decide(engine)) == GAME_OVER:
+            engine.reset(engine.seed + 1)
+        yield list(engine.snakeCoordinates), engine.prey_position, engine.score
+
+
+def benchRenderPygame(lengths=(5, 100, 400), frames=300) -> dict:
+    """
+        This function times Gui.draw_game of the pygame frontend (which only
+        repaints what changed) and a full redraw, frame by frame.
+    """
+    if not os.environ.get("DISPLAY"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        frontend = loadFrontend("part1_snake_alt")
+    except ImportError as error:
+        return {"skipped": str(error)}
+    gui = frontend.Gui()
+    results = {}
+    for length in lengths:
+        incremental, full = [], []
+        gui.full_redraw = True
+        for snake, prey, score in framesOfPlay(frames, length):
+            gui.snakeIcon, gui.preyIcon, gui.score_text = snake, prey, score
+            begin = time.perf_counter()
+            gui.draw_game()
+            incremental.append(time.perf_counter() - begin)
+        for snake, prey, score in framesOfPlay(frames, length):
+            gui.snakeIcon, gui.preyIcon, gui.score_text = snake, prey, score
+            begin = time.perf_counter()
+            gui.redraw_all()
+            full.append(time.perf_counter() - begin)
+        results[str(length)] = {"draw_game": summarize(incremental), "full_redraw": summarize(full)}
+    frontend.pygame.quit()
+    return results
+
+
+def benchRenderTk(lengths=(5, 100, 400), frames=300) -> dict:
+    """
+        This function times one frame of the Tk frontend: the snake task of
+        QueueHandler followed by update_idletasks, which makes Tk redraw.
+    """
+    frontend = loadFrontend("part1_snake")
+    frontend.game = frontend.Game(seed=0)
+    try:
+        gui = frontend.Gui()
+    except Exception as error:     #tkinter.TclError when there is no display
+        return {"skipped": str(error)}
+    frontend.gui = gui
+    results = {}
+    for length in lengths:
+        samples = []
+        previous = None
+        for snake, prey, score in framesOfPlay(frames, length):
+            begin = time.perf_counter()
+            #the same tasks Game.move sends: the new head, or the whole snake after a reset
+            if previous is not None and len(snake) - len(previous) in (0, 1) and snake[-2] == previous[-1]:
+                gui.snakeIcon.advance(snake[-1], len(snake) > len(previous))
+            else:
+                gui.snakeIcon.reset(snake)
+            gui.root.update_idletasks()
+            samples.append(time.perf_counter() - begin)
+            previous = snake
+        results[str(length)] = summarize(samples)
+    gui.root.destroy()
+    return results
+
+
+def benchWorldView(sides=(100, 1000, 3000), length=2000, batches=300, stepsPerBatch=10) -> dict:
+    """
+        This function times a tick on a large board (the step plus the
+        segments in the window that the frontends draw) and measures the
+        memory of the engine, for square boards of the given cells per side
+        and a snake of the given length folded around the middle.
+    """
+    results = {}
+    for side in sides:
+        board = worldConfig(side, side)
+        #fold the snake into 40 columns that end at the starting head
+        folded = serpentineConfig(length, 40, length//40 + stepsPerBatch + 2)
+        headX, headY = board.startCoordinates[-1]
+        dx, dy = headX - folded.startCoordinates[-1][0], headY - folded.startCoordinates[-1][1]
+        board.startCoordinates = [(x + dx, y + dy) for x, y in folded.startCoordinates]
+        board.startDirection = folded.startDirection
+        tracemalloc.start()
+        engine = SnakeEngine(board, 0)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        engine.direction = "Down"
+        engine.prey_position = (-100, -100, -100, -100)
+        camera = Camera(FRONTEND_CONSTANTS["WINDOW_WIDTH"], FRONTEND_CONSTANTS["WINDOW_HEIGHT"], board)
+        start = engine.snapshot()
+        samples = []
+        drawn = 0
+        for _ in range(batches):
+            engine.restore(start)
+            begin = time.perf_counter()
+            for _ in range(stepsPerBatch):
+                engine.step()
+                segments, prey = camera.view(engine)
+                drawn += len(segments)
+            samples.append((time.perf_counter() - begin)/stepsPerBatch)
+        assert engine.gameNotOver
+        results[str(side*side)] = {"tick": summarize(samples), "engine_kib": round(memory/1024, 1),
+                                   "mean_segments_drawn": round(drawn/(batches*stepsPerBatch), 1)}
+    return results
+
+
+BENCHMARKS = {
+    "engine_step": benchEngineStep,
+    "game_move": benchGameMove,
+    "create_new_prey": benchCreateNewPrey,
+    "queue": benchQueue,
+    "render_tk": benchRenderTk,
+    "render_pygame": benchRenderPygame,
+    "world_view": benchWorldView,
+}
+
+
+def compare(baseline, current, tolerance, path=()) -> list:
+    """
+        This function returns the p50 values of current that are more than
+        tolerance (a fraction) slower than in baseline.
+    """
+    regressions = []
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict) and isinstance(old, dict):
+            regressions.extend(compare(old, value, tolerance, path + (key,)))
+        elif key == "p50_us" and isinstance(old, (int, float)) and old > 0 and value > old*(1 + tolerance):
+            regressions.append(("/".join(path), old, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snake engine and renderer benchmarks")
+    parser.add_argument("--output", default="snake_bench.json", help="where to write the JSON results")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p50 slowdown against the baseline (0.2 is 20%%)")
+    args = parser.parse_args()
+
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": {}}
+    for name in args.only or BENCHMARKS:
+        print(f"running {name} ...", flush=True)
+        report["results"][name] = BENCHMARKS[name]()
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(baseline, report["results"], args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: p50 {old:.3f} us -> {new:.3f} us")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,265 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module implements the rules of the snake game without any
+    graphic user interface. The engine is stepped one tick at a time,
+    uses its own seeded random number generator and does not import
+    Tkinter or pygame, so it can be used for simulations, tests and
+    replays as well as by the GUI frontends.
+"""
+
+import random
+from collections import deque
+
+#the result of a single engine step
+MOVED, ATE, GAME_OVER = 0, 1, 2
+
+#the direction of the snake and the (dx, dy) unit vector it moves along
+DIRECTIONS = {"Up": (0, -1), "Down": (0, 1), "Left": (-1, 0), "Right": (1, 0)}
+OPPOSITE = {"Up": "Down", "Down": "Up", "Left": "Right", "Right": "Left"}
+#cells per side of a chunk of ChunkedOccupancy on large boards
+CHUNK_CELLS = 16
+
+
+class GameConfig():
+    """
+        This class holds the constants of the game (board size, icon
+        sizes, movement step and starting snake) that used to be
+        module level globals of the frontends.
+        The board may be larger than a window; with chunkCells the engine
+        keeps the occupied cells in chunks of that many cells per side, so
+        a frontend can ask for the part of the board it shows.
+    """
+    def __init__(self, windowWidth=500, windowHeight=300, snakeIconWidth=15,
+                 preyIconWidth=15, movement=15, threshold=15,
+                 startCoordinates=None, startDirection="Left", chunkCells=None) -> None:
+        self.windowWidth = windowWidth
+        self.windowHeight = windowHeight
+        self.snakeIconWidth = snakeIconWidth
+        self.preyIconWidth = preyIconWidth
+        self.movement = movement
+        #sets how close prey can be to borders
+        self.threshold = threshold
+        #starting length and location of the snake, the head is the last tuple
+        if startCoordinates is None:
+            startCoordinates = [(495, 55), (485, 55), (475, 55),
+                                (465, 55), (455, 55)]
+        self.startCoordinates = list(startCoordinates)
+        self.startDirection = startDirection
+        self.chunkCells = chunkCells
+
+
+class ChunkedOccupancy(set):
+    """
+        This class is the set of points occupied by the snake. It also
+        sorts the points into square chunks of the board, so the points in
+        an area (the part of a large board on the screen) are found without
+        looking at the rest of the board or of the snake. Only chunks with
+        points in them are stored, so the memory used follows the length
+        of the snake and not the size of the board.
+    """
+    def __init__(self, points, chunkSize) -> None:
+        super().__init__()
+        self.chunkSize = chunkSize
+        self.chunks = {}    #(column, row) of a chunk -> set of its points
+        for point in points:
+            self.add(point)
+
+    def add(self, point) -> None:
+        set.add(self, point)
+        size = self.chunkSize
+        key = (point[0]//size, point[1]//size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = set()
+        chunk.add(point)
+
+    def discard(self, point) -> None:
+        if point not in self:
+            return
+        set.discard(self, point)
+        size = self.chunkSize
+        key = (point[0]//size, point[1]//size)
+        chunk = self.chunks[key]
+        chunk.discard(point)
+        if not chunk:
+            del self.chunks[key]
+
+    def inArea(self, left, top, right, bottom) -> list:
+        """
+            This method returns the points with left <= x <= right and
+            top <= y <= bottom, looking only at the chunks that overlap
+            the area. Only the chunks on its edges are filtered point by
+            point.
+        """
+        size = self.chunkSize
+        chunks = self.chunks
+        found = []
+        for column in range(int(left//size), int(right//size) + 1):
+            inColumn = left <= column*size and (column + 1)*size <= right
+            for row in range(int(top//size), int(bottom//size) + 1):
+                chunk = chunks.get((column, row))
+                if not chunk:
+                    continue
+                if inColumn and top <= row*size and (row + 1)*size <= bottom:
+                    found.extend(chunk)
+                else:
+                    found.extend(point for point in chunk
+                                 if left <= point[0] <= right and top <= point[1] <= bottom)
+        return found
+
+
+class SnakeEngine():
+    '''
+        This class implements the game rules: movement, wall and self
+        collision, prey capture, growth and speed up.
+    '''
+    def __init__(self, config=None, seed=None) -> None:
+        """
+            The initializer stores the configuration and starts a new game
+            using the given seed for the prey placement.
+        """
+        self.config = config if config is not None else GameConfig()
+        self.reset(seed)
+
+    def reset(self, seed=None) -> None:
+        """
+            This method restarts the game from the starting snake and
+            reseeds the random number generator.
+        """
+        config = self.config
+        #pick a concrete seed so every game can be reproduced later
+        if seed is None:
+            seed = random.randrange(2**63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.score = 0
+        self.tick = 0
+        #the snake is a deque of (x, y) tuples with the head at the right end,
+        #the set mirrors it so collision checks do not scan the whole body
+        self.snakeCoordinates = deque(config.startCoordinates)
+        self.occupied = self.newOccupancy(self.snakeCoordinates)
+        self.direction = config.startDirection
+        self.gameNotOver = True
+        self.prey_position = None
+        #this factor controls how fast the game goes
+        self._time_factor = 1
+        self.createNewPrey()
+
+    def snapshot(self) -> tuple:
+        """
+            This method returns a copy of the whole game state, including
+            the state of the random number generator, for restore().
+        """
+        return (tuple(self.snakeCoordinates), self.direction, self.score,
+                self.tick, self.gameNotOver, self.prey_position,
+                self._time_factor, self.rng.getstate())
+
+    def restore(self, state) -> None:
+        """
+            This method puts the game back into a state taken by snapshot().
+        """
+        (snake, self.direction, self.score, self.tick, self.gameNotOver,
+         self.prey_position, self._time_factor, rngState) = state
+        self.snakeCoordinates = deque(snake)
+        self.occupied = self.newOccupancy(snake)
+        self.rng.setstate(rngState)
+
+    def newOccupancy(self, points) -> set:
+        """
+            This method returns the set of occupied points, chunked if the
+            configuration asks for it. A plain set is faster to update.
+        """
+        config = self.config
+        if config.chunkCells:
+            return ChunkedOccupancy(points, config.chunkCells*config.movement)
+        return set(points)
+
+    def turn(self, direction) -> None:
+        """
+            This method sets the movement direction. Unknown directions and
+            turning straight back onto the body are ignored.
+        """
+        if direction in DIRECTIONS and direction != OPPOSITE[self.direction]:
+            self.direction = direction
+
+    def step(self, action=None) -> int:
+        """
+            This method advances the game by one tick, optionally turning
+            to the direction given as action first.
+            It returns MOVED, ATE or GAME_OVER.
+        """
+        if not self.gameNotOver:
+            return GAME_OVER
+        if action is not None:
+            self.turn(action)
+        head = self.calculateNewCoordinates()
+        if self.isGameOver(head):
+            return GAME_OVER
+        self.tick += 1
+        self.snakeCoordinates.append(head)
+        self.occupied.add(head)
+        if self.isPreyCaptured(head):
+            #the snake keeps its tail so it grows by one
+            self.score += 1
+            self.createNewPrey()
+            #we increase the snake speed by 10% each time it has ate a prey
+            if self._time_factor > 0.4:
+                self._time_factor -= 0.1
+            return ATE
+        self.occupied.discard(self.snakeCoordinates.popleft())
+        return MOVED
+
+    def calculateNewCoordinates(self) -> tuple:
+        """
+            This method calculates and returns the new coordinates of the
+            head of the snake based on the movement direction.
+        """
+        lastX, lastY = self.snakeCoordinates[-1]
+        dx, dy = DIRECTIONS[self.direction]
+        movement = self.config.movement
+        return (lastX + dx*movement, lastY + dy*movement)
+
+    def isGameOver(self, snakeCoordinates) -> bool:
+        """
+            This method checks if the new head has passed any wall or
+            if the snake has bit itself, and updates gameNotOver.
+        """
+        x, y = snakeCoordinates
+        config = self.config
+        if (x > config.windowWidth or x < 0 or y > config.windowHeight or y < 0
+                or snakeCoordinates in self.occupied):
+            self.gameNotOver = False
+            return True
+        return False
+
+    def isPreyCaptured(self, snakeCoordinates) -> bool:
+        """
+            This method checks if the head is within the bound of the prey
+            +/- half the snake icon width.
+        """
+        x, y = snakeCoordinates
+        x1, y1, x2, y2 = self.prey_position
+        half = self.config.snakeIconWidth/2
+        return x1 - half <= x <= x2 + half and y1 - half <= y <= y2 + half
+
+    def createNewPrey(self) -> None:
+        """
+            This method picks a random x and y at least threshold away from
+            the walls and not on the snake, and stores the prey rectangle
+            (x - w/2, y - w/2, x + w/2, y + w/2) in prey_position.
+        """
+        config = self.config
+        randint = self.rng.randint
+        threshold = config.threshold
+        maxX = config.windowWidth - threshold
+        maxY = config.windowHeight - threshold
+        x = randint(threshold, maxX)
+        y = randint(threshold, maxY)
+        #this ensures the prey does not land on top of the snake
+        while (x, y) in self.occupied:
+            x = randint(threshold, maxX)
+            y = randint(threshold, maxY)
+        half = config.preyIconWidth/2
+        self.prey_position = (x - half, y - half, x + half, y + half)
@@ -0,0 +1,716 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module implements networked multiplayer snake over TCP.
+
+    The server is authoritative: it runs a SnakeMatch (one SnakeEngine per
+    player, all on the same board and chasing the same prey) on a fixed
+    tick, applies the direction inputs it receives from the players, and
+    sends every player and spectator a compact delta of what changed in
+    that tick. A delta is encoded once per tick and the same bytes are
+    queued for every connection, so a slow connection never holds up the
+    tick or the other connections.
+
+    Every message is a frame: length (I), type (B) and payload, little
+    endian. The client keeps a MatchState mirror of the match and can
+    interpolate the snakes between the last two ticks for smooth drawing.
+
+    Run it as a script to start a server, or with --bench to measure how
+    many spectators a match can feed.
+"""
+
+import argparse
+import random
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque, Counter
+
+from snake_engine import SnakeEngine, GameConfig, DIRECTIONS, MOVED, ATE, GAME_OVER
+
+#a snake that (re)appears on the board, sent with its whole body
+SPAWN = 3
+
+#frame types sent by clients
+HELLO, TURN = 1, 2
+#frame types sent by the server
+WELCOME, FULL, DELTA = 10, 11, 12
+
+PLAYER, SPECTATOR = 0, 1
+DIRECTION_NAMES = tuple(DIRECTIONS)
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTION_NAMES)}
+
+_FRAME = struct.Struct("<IB")
+_WELCOME = struct.Struct("<bf6h")
+_FULL = struct.Struct("<IhhB")
+_SNAKE = struct.Struct("<BHBH")
+_DELTA = struct.Struct("<IBhhB")
+_ENTRY = struct.Struct("<BB")
+_POINT = struct.Struct("<hh")
+
+
+def encodeFrame(frameType, payload=b"") -> bytes:
+    """
+        This function wraps a payload into a frame.
+    """
+    return _FRAME.pack(len(payload) + 1, frameType) + payload
+
+
+def recvExact(sock, size) -> bytes:
+    """
+        This function reads exactly size bytes from sock, or returns
+        b"" if the connection was closed.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return b""
+        data += chunk
+    return bytes(data)
+
+
+def recvFrame(sock) -> tuple:
+    """
+        This function reads one frame and returns (type, payload), or
+        (None, b"") if the connection was closed.
+    """
+    header = recvExact(sock, _FRAME.size)
+    if not header:
+        return None, b""
+    length, frameType = _FRAME.unpack(header)
+    payload = recvExact(sock, length - 1) if length > 1 else b""
+    if length > 1 and not payload:
+        return None, b""
+    return frameType, payload
+
+
+def _packPoints(points) -> bytes:
+    return b"".join(_POINT.pack(*point) for point in points)
+
+
+class SnakeMatch():
+    '''
+        This class runs several snakes on one board. Each player has its
+        own SnakeEngine for movement, turning, wall and self collision and
+        growth, in its own lane; the match adds collisions between snakes
+        (through a shared map of occupied cells), a single shared prey and
+        respawning of dead snakes.
+        Subclasses can place the snakes and the prey differently by
+        overriding laneConfig, occupy, vacate, preyAt and eat.
+    '''
+    def __init__(self, config=None, seed=None, maxPlayers=6, respawnTicks=20) -> None:
+        self.config = config if config is not None else GameConfig()
+        self.rng = random.Random(seed)
+        self.maxPlayers = maxPlayers
+        self.respawnTicks = respawnTicks
+        self.tick = 0
+        self.snakes = {}        #player id -> SnakeEngine of the living snakes
+        self.scores = {}        #player id -> score of the current life
+        self.respawnAt = {}     #player id -> tick of the next spawn
+        self.occupiedBy = {}    #(x, y) -> player id
+        self.pendingEvents = []
+        self.prey_position = None
+        self.createNewPrey()
+
+    def laneConfig(self, playerId) -> GameConfig:
+        """
+            This method returns the configuration of a player's engine,
+            whose starting snake is moved down into the player's lane.
+        """
+        config = self.config
+        laneHeight = 3*config.movement
+        offset = laneHeight*playerId
+        start = [(x, y + offset) for x, y in config.startCoordinates]
+        return GameConfig(config.windowWidth, config.windowHeight, config.snakeIconWidth,
+                          config.preyIconWidth, config.movement, config.threshold,
+                          start, config.startDirection)
+
+    def addPlayer(self) -> int:
+        """
+            This method adds a player and spawns its snake. It returns the
+            player id, or None when the match is full.
+        """
+        players = set(self.snakes) | set(self.respawnAt)
+        for playerId in range(self.maxPlayers):
+            if playerId not in players:
+                if self.spawn(playerId):
+                    self.pendingEvents.append((playerId, SPAWN))
+                else:
+                    self.respawnAt[playerId] = self.tick + 1
+                return playerId
+        return None
+
+    def removePlayer(self, playerId) -> None:
+        """
+            This method takes a player and its snake off the board.
+        """
+        self.respawnAt.pop(playerId, None)
+        self.scores.pop(playerId, None)
+        if playerId in self.snakes:
+            self.kill(playerId)
+            self.respawnAt.pop(playerId, None)
+            self.pendingEvents.append((playerId, GAME_OVER))
+
+    def spawn(self, playerId) -> bool:
+        """
+            This method puts a new snake for the player on the board and
+            returns False if another snake is in the way.
+        """
+        config = self.laneConfig(playerId)
+        if any(point in self.occupiedBy for point in config.startCoordinates):
+            return False
+        engine = SnakeEngine(config, self.rng.randrange(2**63))
+        self.snakes[playerId] = engine
+        self.scores[playerId] = 0
+        for point in engine.snakeCoordinates:
+            self.occupy(point, playerId)
+        return True
+
+    def kill(self, playerId) -> None:
+        """
+            This method removes a dead snake and schedules its respawn.
+        """
+        engine = self.snakes.pop(playerId)
+        for point in engine.snakeCoordinates:
+            if self.occupiedBy.get(point) == playerId:
+                self.vacate(point)
+        self.respawnAt[playerId] = self.tick + self.respawnTicks
+
+    def occupy(self, point, playerId) -> None:
+        self.occupiedBy[point] = playerId
+
+    def vacate(self, point) -> None:
+        del self.occupiedBy[point]
+
+    def preyAt(self, head) -> tuple:
+        """
+            This method returns the prey rectangle that a snake moving its
+            head to head should be checked against.
+        """
+        return self.prey_position
+
+    def eat(self, head) -> None:
+        """
+            This method replaces the prey eaten by a snake at head.
+        """
+        self.createNewPrey()
+
+    def turn(self, playerId, direction) -> None:
+        """
+            This method turns the snake of a player, if it is alive.
+        """
+        engine = self.snakes.get(playerId)
+        if engine is not None:
+            engine.turn(direction)
+
+    def step(self) -> list:
+        """
+            This method advances the match by one tick and returns the list
+            of (player id, MOVED/ATE/GAME_OVER/SPAWN) events.
+        """
+        self.tick += 1
+        events, self.pendingEvents = self.pendingEvents, []
+        for playerId, tick in list(self.respawnAt.items()):
+            if tick <= self.tick:
+                if self.spawn(playerId):
+                    del self.respawnAt[playerId]
+                    events.append((playerId, SPAWN))
+                else:
+                    self.respawnAt[playerId] = self.tick + 1
+        #a snake that has just appeared is sent whole and starts moving next tick
+        spawned = {playerId for playerId, event in events if event == SPAWN}
+
+        #collisions are decided on the board as it was before anyone moved
+        heads = {playerId: engine.calculateNewCoordinates()
+                 for playerId, engine in self.snakes.items() if playerId not in spawned}
+        headCounts = Counter(heads.values())
+        dead = [playerId for playerId, head in heads.items()
+                if headCounts[head] > 1 or self.occupiedBy.get(head, playerId) != playerId]
+        for playerId in dead:
+            self.kill(playerId)
+            events.append((playerId, GAME_OVER))
+
+        for playerId, engine in list(self.snakes.items()):
+            if playerId in spawned:
+                continue
+            engine.prey_position = self.preyAt(heads[playerId])
+            tail = engine.snakeCoordinates[0]
+            event = engine.step()
+            if event == GAME_OVER:
+                self.kill(playerId)
+            else:
+                head = engine.snakeCoordinates[-1]
+                self.occupy(head, playerId)
+                if event == MOVED:
+                    self.vacate(tail)
+                else:
+                    self.scores[playerId] += 1
+                    self.eat(head)
+            events.append((playerId, event))
+        return events
+
+    def createNewPrey(self) -> None:
+        """
+            This method places the shared prey like SnakeEngine.createNewPrey,
+            avoiding every snake on the board.
+        """
+        config = self.config
+        threshold = config.threshold
+        while True:
+            x = self.rng.randint(threshold, config.windowWidth - threshold)
+            y = self.rng.randint(threshold, config.windowHeight - threshold)
+            if (x, y) not in self.occupiedBy:
+                break
+        half = config.preyIconWidth/2
+        self.prey_position = (x - half, y - half, x + half, y + half)
+
+    def preyCentre(self) -> tuple:
+        half = self.config.preyIconWidth/2
+        return int(self.prey_position[0] + half), int(self.prey_position[1] + half)
+
+    def encodeFull(self) -> bytes:
+        """
+            This method encodes the whole match state as a FULL frame.
+        """
+        parts = [_FULL.pack(self.tick, *self.preyCentre(), len(self.snakes))]
+        for playerId, engine in self.snakes.items():
+            parts.append(_SNAKE.pack(playerId, self.scores[playerId],
+                                     DIRECTION_CODES[engine.direction],
+                                     len(engine.snakeCoordinates)))
+            parts.append(_packPoints(engine.snakeCoordinates))
+        return encodeFrame(FULL, b"".join(parts))
+
+    def encodeDelta(self, events, preyChanged) -> bytes:
+        """
+            This method encodes the events of one tick as a DELTA frame:
+            the new head for MOVED and ATE, the whole body for SPAWN and
+            nothing more for GAME_OVER.
+        """
+        parts = [_DELTA.pack(self.tick, preyChanged, *self.preyCentre(), len(events))]
+        for playerId, event in events:
+            parts.append(_ENTRY.pack(playerId, event))
+            if event == MOVED or event == ATE:
+                parts.append(_POINT.pack(*self.snakes[playerId].snakeCoordinates[-1]))
+            elif event == SPAWN:
+                snake = self.snakes[playerId].snakeCoordinates if playerId in self.snakes else ()
+                parts.append(struct.pack("<H", len(snake)))
+                parts.append(_packPoints(snake))
+        return encodeFrame(DELTA, b"".join(parts))
+
+
+class Subscriber():
+    """
+        This class sends frames to one connection from its own thread.
+        Frames are queued by the tick thread and written in batches; a
+        connection that falls more than maxBacklog frames behind is closed
+        instead of slowing everybody else down.
+    """
+    def __init__(self, sock, playerId, maxBacklog=64) -> None:
+        self.socket = sock
+        self.playerId = playerId
+        self.maxBacklog = maxBacklog
+        self.frames = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.writer_thread = threading.Thread(target=self.write_frames, daemon=True)
+        self.writer_thread.start()
+
+    def send(self, frame) -> bool:
+        """
+            This method queues a frame and returns False if the connection
+            is closed or too far behind.
+        """
+        with self.condition:
+            if self.closed:
+                return False
+            if len(self.frames) >= self.maxBacklog:
+                self.closed = True
+                self.condition.notify()
+                return False
+            self.frames.append(frame)
+            self.condition.notify()
+            return True
+
+    def write_frames(self) -> None:
+        """
+            This method writes queued frames until the connection closes.
+        """
+        while True:
+            with self.condition:
+                while not self.frames and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    break
+                batch = b"".join(self.frames)
+                self.frames.clear()
+            try:
+                self.socket.sendall(batch)
+            except OSError:
+                break
+        self.close()
+
+    def close(self) -> None:
+        """
+            This method closes the connection.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+
+class MatchServer():
+    """
+        This class implements the authoritative match server. One thread
+        accepts connections, one thread per connection reads its inputs and
+        one thread runs the match on a fixed tick and fans out the deltas.
+    """
+    def __init__(self, host='127.0.0.1', port=65534, tickInterval=0.15, seed=None,
+                 maxBacklog=64) -> None:
+        self.match = SnakeMatch(seed=seed)
+        self.tickInterval = tickInterval
+        self.maxBacklog = maxBacklog
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.running = True
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(1000)
+        self.address = self.server_socket.getsockname()
+
+    def serve_forever(self) -> None:
+        """
+            This method accepts connections in the background and runs the
+            tick loop in the calling thread.
+        """
+        threading.Thread(target=self.accept_connections, daemon=True).start()
+        self.tick_loop()
+
+    def start(self) -> None:
+        """
+            This method runs the whole server in background threads.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.running = False
+        self.server_socket.close()
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+
+    def accept_connections(self) -> None:
+        """
+            Continuously accept incoming connections.
+        """
+        while self.running:
+            try:
+                client_socket, address = self.server_socket.accept()
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
+            except OSError:
+                break
+
+    def handle_client(self, client_socket) -> None:
+        """
+            Handle one connection: register it as a player or spectator,
+            then apply its direction inputs until it disconnects.
+        """
+        subscriber = None
+        try:
+            frameType, payload = recvFrame(client_socket)
+            if frameType != HELLO or not payload:
+                return
+            with self.lock:
+                playerId = self.match.addPlayer() if payload[0] == PLAYER else None
+                subscriber = Subscriber(client_socket, playerId, self.maxBacklog)
+                config = self.match.config
+                subscriber.send(encodeFrame(WELCOME, _WELCOME.pack(
+                    -1 if playerId is None else playerId, self.tickInterval,
+                    config.windowWidth, config.windowHeight, config.snakeIconWidth,
+                    config.preyIconWidth, config.movement, config.threshold)))
+                #the full state goes out before any delta of a later tick
+                subscriber.send(self.match.encodeFull())
+                self.subscribers.append(subscriber)
+
+            while True:
+                frameType, payload = recvFrame(client_socket)
+                if frameType is None:
+                    break
+                if frameType == TURN and playerId is not None and payload:
+                    with self.lock:
+                        self.match.turn(playerId, DIRECTION_NAMES[payload[0] & 3])
+        except OSError:
+            pass
+        finally:
+            if subscriber is not None:
+                with self.lock:
+                    self.drop(subscriber)
+            else:
+                client_socket.close()
+
+    def drop(self, subscriber) -> None:
+        """
+            This method forgets a connection and removes its snake. It is
+            called with the lock held.
+        """
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+            if subscriber.playerId is not None:
+                self.match.removePlayer(subscriber.playerId)
+        subscriber.close()
+
+    def tick_loop(self) -> None:
+        """
+            This method steps the match on a fixed tick and sends the same
+            encoded delta to every connection.
+        """
+        nextTick = time.monotonic()
+        while self.running:
+            with self.lock:
+                prey = self.match.prey_position
+                events = self.match.step()
+                frame = self.match.encodeDelta(events, self.match.prey_position != prey)
+                for subscriber in list(self.subscribers):
+                    if not subscriber.send(frame):
+                        self.drop(subscriber)
+            nextTick += self.tickInterval
+            delay = nextTick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                #we are behind, do not try to catch up with a burst of ticks
+                nextTick = time.monotonic()
+
+
+class MatchState():
+    """
+        This class mirrors the match on the client side by applying the
+        FULL and DELTA frames from the server.
+    """
+    def __init__(self, config) -> None:
+        self.config = config
+        self.tick = 0
+        self.snakes = {}        #player id -> deque of (x, y), head last
+        self.scores = {}
+        self.popped = {}        #player id -> tail removed by the last tick
+        self.moved = set()      #players that moved in the last tick
+        self.preyCentre = None
+        self.tickTime = time.monotonic()
+
+    def prey_position(self) -> tuple:
+        x, y = self.preyCentre
+        half = self.config.preyIconWidth/2
+        return (x - half, y - half, x + half, y + half)
+
+    def applyFull(self, payload) -> None:
+        self.tick, preyX, preyY, numSnakes = _FULL.unpack_from(payload, 0)
+        self.preyCentre = (preyX, preyY)
+        offset = _FULL.size
+        self.snakes.clear()
+        self.scores.clear()
+        self.popped.clear()
+        self.moved.clear()
+        for _ in range(numSnakes):
+            playerId, score, _, length = _SNAKE.unpack_from(payload, offset)
+            offset += _SNAKE.size
+            self.snakes[playerId] = deque(_POINT.unpack_from(payload, offset + i*_POINT.size)
+                                          for i in range(length))
+            offset += length*_POINT.size
+            self.scores[playerId] = score
+        self.tickTime = time.monotonic()
+
+    def applyDelta(self, payload) -> None:
+        self.tick, _, preyX, preyY, numEvents = _DELTA.unpack_from(payload, 0)
+        self.preyCentre = (preyX, preyY)
+        offset = _DELTA.size
+        self.popped.clear()
+        self.moved.clear()
+        for _ in range(numEvents):
+            playerId, event = _ENTRY.unpack_from(payload, offset)
+            offset += _ENTRY.size
+            if event == MOVED or event == ATE:
+                head = _POINT.unpack_from(payload, offset)
+                offset += _POINT.size
+                snake = self.snakes.get(playerId)
+                if snake is None:
+                    continue
+                snake.append(head)
+                self.moved.add(playerId)
+                if event == MOVED:
+                    self.popped[playerId] = snake.popleft()
+                else:
+                    self.scores[playerId] = self.scores.get(playerId, 0) + 1
+            elif event == SPAWN:
+                (length,) = struct.unpack_from("<H", payload, offset)
+                offset += 2
+                self.snakes[playerId] = deque(_POINT.unpack_from(payload, offset + i*_POINT.size)
+                                              for i in range(length))
+                offset += length*_POINT.size
+                self.scores[playerId] = 0
+            elif event == GAME_OVER:
+                self.snakes.pop(playerId, None)
+                self.scores.pop(playerId, None)
+        self.tickTime = time.monotonic()
+
+    def interpolated(self, tickInterval, now=None) -> dict:
+        """
+            This method returns each snake as a polyline part way between
+            the previous tick and the last one: the head slides towards its
+            new cell and the tail towards the cell it moved off.
+        """
+        if now is None:
+            now = time.monotonic()
+        alpha = min(1.0, max(0.0, (now - self.tickTime)/tickInterval))
+        snakes = {}
+        for playerId, snake in self.snakes.items():
+            points = list(snake)
+            if playerId in self.moved and len(points) > 1:
+                (x0, y0), (x1, y1) = points[-2], points[-1]
+                points[-1] = (x0 + (x1 - x0)*alpha, y0 + (y1 - y0)*alpha)
+                tail = self.popped.get(playerId)
+                if tail is not None:
+                    x0, y0 = tail
+                    x1, y1 = points[0]
+                    points.insert(0, (x0 + (x1 - x0)*alpha, y0 + (y1 - y0)*alpha))
+            snakes[playerId] = points
+        return snakes
+
+
+class MatchClient():
+    """
+        This class connects to a MatchServer as a player or a spectator and
+        keeps a MatchState up to date from a receive thread.
+    """
+    def __init__(self, host='127.0.0.1', port=65534, spectate=False) -> None:
+        self.client_socket = socket.create_connection((host, port))
+        self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.client_socket.sendall(encodeFrame(HELLO, bytes([SPECTATOR if spectate else PLAYER])))
+        frameType, payload = recvFrame(self.client_socket)
+        if frameType != WELCOME:
+            raise ConnectionError("unexpected reply from the match server")
+        (playerId, self.tickInterval, width, height, snakeWidth, preyWidth,
+         movement, threshold) = _WELCOME.unpack(payload)
+        self.playerId = None if playerId < 0 else playerId
+        self.config = GameConfig(width, height, snakeWidth, preyWidth, movement, threshold)
+        self.state = MatchState(self.config)
+        self.lock = threading.Lock()
+        self.connected = True
+        self.receive_thread = threading.Thread(target=self.receive_frames, daemon=True)
+        self.receive_thread.start()
+
+    def turn(self, direction) -> None:
+        """
+            This method sends a direction input to the server.
+        """
+        if self.playerId is not None and direction in DIRECTION_CODES:
+            try:
+                self.client_socket.sendall(encodeFrame(TURN, bytes([DIRECTION_CODES[direction]])))
+            except OSError:
+                self.connected = False
+
+    def receive_frames(self) -> None:
+        """
+            Continuously receive frames and apply them to the state.
+        """
+        try:
+            while True:
+                frameType, payload = recvFrame(self.client_socket)
+                if frameType is None:
+                    break
+                with self.lock:
+                    if frameType == DELTA:
+                        self.state.applyDelta(payload)
+                    elif frameType == FULL:
+                        self.state.applyFull(payload)
+        except OSError:
+            pass
+        self.connected = False
+
+    def snapshot(self) -> tuple:
+        """
+            This method returns (interpolated snakes, prey rectangle, scores).
+        """
+        with self.lock:
+            state = self.state
+            if state.preyCentre is None:
+                return {}, None, {}
+            return (state.interpolated(self.tickInterval), state.prey_position(),
+                    dict(state.scores))
+
+    def close(self) -> None:
+        try:
+            self.client_socket.close()
+        except OSError:
+            pass
+
+
+def benchmark(numSpectators=500, seconds=5.0, tickInterval=0.05, numPlayers=4) -> dict:
+    """
+        This function runs a server with a few players and numSpectators
+        spectators read from one selector thread, and reports the tick rate
+        the spectators actually received and the bytes per delta.
+    """
+    server = MatchServer(port=0, tickInterval=tickInterval, maxBacklog=1024)
+    server.start()
+    host, port = server.address
+    players = [MatchClient(host, port) for _ in range(numPlayers)]
+    selector = selectors.DefaultSelector()
+    received = {}
+    for _ in range(numSpectators):
+        sock = socket.create_connection((host, port))
+        sock.sendall(encodeFrame(HELLO, bytes([SPECTATOR])))
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        received[sock] = 0
+    rng = random.Random(0)
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        for player in players:
+            if rng.random() < 0.2:
+                player.turn(rng.choice(DIRECTION_NAMES))
+        for key, _ in selector.select(timeout=0.01):
+            try:
+                received[key.fileobj] += len(key.fileobj.recv(65536))
+            except BlockingIOError:
+                pass
+    elapsed = time.monotonic() - start
+    ticks = server.match.tick
+    with server.lock:
+        connected = len(server.subscribers) - numPlayers
+    server.stop()
+    total = sum(received.values())
+    return {
+        "spectators": numSpectators,
+        "server ticks/sec": ticks/elapsed,
+        "spectators still keeping up": connected,
+        "bytes/sec per spectator": total/numSpectators/elapsed,
+        "bytes per tick per spectator": total/numSpectators/max(1, ticks),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Networked snake match server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65534)
+    parser.add_argument("--tick", type=float, default=0.15, help="seconds per tick")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--bench", type=int, metavar="SPECTATORS",
+                        help="benchmark fan-out to this many spectators instead of serving")
+    args = parser.parse_args()
+    if args.bench:
+        for name, value in benchmark(args.bench, tickInterval=args.tick).items():
+            print(f"{name}: {value:,.1f}")
+    else:
+        print(f"snake match server on {args.host}:{args.port}")
+        MatchServer(args.host, args.port, args.tick, args.seed).serve_forever()
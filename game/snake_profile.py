@@ -0,0 +1,145 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module times the phases of a running snake game for the
+    performance HUD of the frontends and for offline analysis.
+
+    The phases are:
+        step    SnakeEngine.step (or the replay/recorder step) of one tick
+        queue   delay between putting a tick's task on the queue and the
+                GUI thread taking it off
+        draw    one frame of the GUI: the canvas calls and the repaint
+        key     an arrow key press that turned the snake until the first
+                frame drawn after the tick that applied it
+
+    The hooks in the frontends test the enabled flag before reading any
+    clock, so a disabled profiler costs one attribute lookup per hook.
+"""
+
+import csv
+import time
+from collections import deque
+
+PHASES = ("step", "queue", "draw", "key")
+
+
+def formatDuration(seconds) -> str:
+    """
+        This function formats a duration with a unit that suits its size.
+    """
+    if seconds < 1e-3:
+        return f"{seconds*1e6:.0f}us"
+    return f"{seconds*1e3:.1f}ms"
+
+
+class TickProfiler():
+    """
+        This class keeps the most recent window samples of every phase,
+        together with the times of the recent ticks and frames, and can
+        keep every sample for export to CSV.
+    """
+    def __init__(self, samplesTo=None, window=300) -> None:
+        """
+            With samplesTo every sample is kept and save() writes them to
+            that CSV file; this also enables the profiler from the start.
+        """
+        self.samplesTo = samplesTo
+        self.enabled = samplesTo is not None
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES}
+        self.tickTimes = deque(maxlen=window)
+        self.frameTimes = deque(maxlen=window)
+        self.rows = []      #(time, tick, phase, seconds) when exporting
+        self.keyTime = None
+        self.lastTick = None
+        self.start = time.perf_counter()
+
+    def setEnabled(self, enabled) -> None:
+        """
+            This method turns the profiler on or off. It always stays on
+            while it is exporting, and starts with fresh rolling windows.
+        """
+        enabled = enabled or self.samplesTo is not None
+        if enabled and not self.enabled:
+            for samples in self.samples.values():
+                samples.clear()
+            self.tickTimes.clear()
+            self.frameTimes.clear()
+            self.keyTime = None
+        self.enabled = enabled
+
+    def record(self, phase, seconds, tick=None) -> None:
+        """
+            This method adds one sample of a phase.
+        """
+        self.samples[phase].append(seconds)
+        if tick is not None:
+            self.lastTick = tick
+        if self.samplesTo is not None:
+            self.rows.append((time.perf_counter() - self.start, self.lastTick, phase, seconds))
+
+    def tickDone(self, now) -> None:
+        self.tickTimes.append(now)
+
+    def frameDone(self, now) -> None:
+        self.frameTimes.append(now)
+
+    def keyPressed(self) -> None:
+        """
+            This method notes a key press that turned the snake; only the
+            first press before the next tick counts.
+        """
+        if self.keyTime is None:
+            self.keyTime = time.perf_counter()
+
+    def takeKey(self):
+        """
+            This method returns the time of the pending key press, or
+            None, and clears it. It is called by the tick that applies it.
+        """
+        keyTime, self.keyTime = self.keyTime, None
+        return keyTime
+
+    def rate(self, times, now) -> int:
+        """
+            This method returns how many of times fall in the last second.
+        """
+        return sum(1 for moment in list(times) if now - moment <= 1.0)
+
+    def percentile(self, phase, fraction=0.99):
+        """
+            This method returns a percentile of the rolling window of a
+            phase, or None without samples.
+        """
+        ordered = sorted(list(self.samples[phase]))
+        if not ordered:
+            return None
+        return ordered[int(fraction*(len(ordered) - 1))]
+
+    def hudLines(self) -> list:
+        """
+            This method returns the lines shown by the HUD: frames and
+            ticks per second over the last second and the p99 of each phase.
+        """
+        now = time.perf_counter()
+        lines = [f"FPS {self.rate(self.frameTimes, now):3d}  ticks/s {self.rate(self.tickTimes, now):3d}"]
+        for phase in PHASES:
+            value = self.percentile(phase)
+            lines.append(f"p99 {phase:<5} {'-' if value is None else formatDuration(value):>8}")
+        return lines
+
+    def save(self) -> None:
+        """
+            This method writes the kept samples, if any, to the CSV file,
+            one row per sample: seconds since the start, tick, phase and
+            duration in microseconds.
+        """
+        if self.samplesTo is None:
+            return
+        with open(self.samplesTo, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("time_s", "tick", "phase", "duration_us"))
+            for moment, tick, phase, seconds in self.rows:
+                writer.writerow((f"{moment:.6f}", "" if tick is None else tick,
+                                 phase, f"{seconds*1e6:.1f}"))
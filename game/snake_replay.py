@@ -0,0 +1,238 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module records a snake game as its seed plus the stream of
+    direction changes, and plays such a recording back deterministically
+    at any speed.
+
+    File layout (little endian):
+        header  "SNKR", version (B), seed (q)
+        config  windowWidth, windowHeight (II), snakeIconWidth,
+                preyIconWidth, movement, threshold (4h), start direction (B),
+                number of starting segments (H) and their (x, y) (ii each)
+        stream  one varint per direction change, (gap << 2) | direction,
+                where gap is the number of ticks since the previous change.
+                The stream ends with a change to the direction the snake
+                already has, whose gap covers the remaining ticks.
+
+    Run it as a script with a recording to print a summary of the game.
+"""
+
+import bisect
+import struct
+import sys
+import time
+
+from snake_engine import SnakeEngine, GameConfig, DIRECTIONS, GAME_OVER
+
+MAGIC = b"SNKR"
+VERSION = 2     #2 widened the board size and the points for large worlds
+#direction names indexed by their 2-bit code
+DIRECTION_NAMES = tuple(DIRECTIONS)
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTION_NAMES)}
+
+_HEADER = struct.Struct("<4sBq")
+_CONFIG = struct.Struct("<II4hBH")
+_POINT = struct.Struct("<ii")
+
+
+def _writeVarint(buffer, value) -> None:
+    """
+        This function appends value to buffer, 7 bits per byte.
+    """
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _readVarint(data, offset) -> tuple:
+    """
+        This function reads a varint from data and returns
+        (value, offset after it).
+    """
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class ReplayRecorder():
+    """
+        This class records a game while it is played. It wraps the step()
+        method of the engine and only writes something when the direction
+        of the snake has changed since the previous tick, so the cost per
+        tick is a single comparison.
+    """
+    def __init__(self, engine) -> None:
+        if engine.tick != 0 or not engine.gameNotOver:
+            raise ValueError("recording must start with a new game")
+        self.engine = engine
+        config = engine.config
+        self.data = bytearray(_HEADER.pack(MAGIC, VERSION, engine.seed))
+        self.data += _CONFIG.pack(
+            config.windowWidth, config.windowHeight, config.snakeIconWidth,
+            config.preyIconWidth, config.movement, config.threshold,
+            DIRECTION_CODES[config.startDirection], len(config.startCoordinates))
+        for point in config.startCoordinates:
+            self.data += _POINT.pack(*point)
+        self.ticks = 0
+        self.lastChange = 0
+        self.direction = engine.direction
+        self.finished = False
+
+    def step(self, action=None) -> int:
+        """
+            This method records the direction used for this tick and then
+            steps the engine. Turns made directly on the engine between
+            ticks (for example by the key handler) are picked up too.
+        """
+        engine = self.engine
+        if action is not None:
+            engine.turn(action)
+        if engine.direction != self.direction:
+            self.direction = engine.direction
+            _writeVarint(self.data, (self.ticks - self.lastChange) << 2
+                         | DIRECTION_CODES[self.direction])
+            self.lastChange = self.ticks
+        self.ticks += 1
+        return engine.step()
+
+    def finish(self) -> bytes:
+        """
+            This method ends the stream and returns the whole recording.
+        """
+        if not self.finished:
+            _writeVarint(self.data, (self.ticks - self.lastChange) << 2
+                         | DIRECTION_CODES[self.direction])
+            self.finished = True
+        return bytes(self.data)
+
+    def save(self, path) -> None:
+        """
+            This method ends the stream and writes the recording to path.
+        """
+        with open(path, "wb") as file:
+            file.write(self.finish())
+
+
+class ReplayPlayer():
+    """
+        This class plays a recording back on a new engine. It can step one
+        tick at a time, play in real time or fast-forward, and seek to any
+        tick. While playing it keeps a snapshot of the engine every
+        snapshotInterval ticks so seeking only replays the ticks after the
+        closest snapshot. chunkCells is passed on to the configuration of
+        the engine, it does not change the game.
+    """
+    def __init__(self, data, snapshotInterval=256, chunkCells=None) -> None:
+        magic, version, seed = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a snake recording")
+        if version != VERSION:
+            raise ValueError(f"unsupported recording version {version}")
+        offset = _HEADER.size
+        (width, height, snakeWidth, preyWidth, movement, threshold,
+         startDirection, numStart) = _CONFIG.unpack_from(data, offset)
+        offset += _CONFIG.size
+        startCoordinates = []
+        for _ in range(numStart):
+            startCoordinates.append(_POINT.unpack_from(data, offset))
+            offset += _POINT.size
+        self.config = GameConfig(width, height, snakeWidth, preyWidth, movement,
+                                 threshold, startCoordinates,
+                                 DIRECTION_NAMES[startDirection], chunkCells)
+        self.seed = seed
+
+        #decode the stream into the ticks of the changes and their directions
+        self.changeTicks = []
+        self.changeDirections = []
+        tick = 0
+        direction = self.config.startDirection
+        while offset < len(data):
+            value, offset = _readVarint(data, offset)
+            tick += value >> 2
+            newDirection = DIRECTION_NAMES[value & 3]
+            if newDirection == direction:
+                break
+            direction = newDirection
+            self.changeTicks.append(tick)
+            self.changeDirections.append(direction)
+        self.ticks = tick
+
+        self.engine = SnakeEngine(self.config, seed)
+        self.tick = 0
+        self._nextChange = 0
+        self.snapshotInterval = snapshotInterval
+        self.snapshots = {0: self.engine.snapshot()}
+
+    @classmethod
+    def load(cls, path, snapshotInterval=256, chunkCells=None) -> "ReplayPlayer":
+        """
+            This method reads a recording from path.
+        """
+        with open(path, "rb") as file:
+            return cls(file.read(), snapshotInterval, chunkCells)
+
+    def step(self) -> int:
+        """
+            This method replays the next recorded tick and returns the
+            result of the engine step (GAME_OVER once the recording ends).
+        """
+        if self.tick >= self.ticks:
+            return GAME_OVER
+        index = self._nextChange
+        if index < len(self.changeTicks) and self.changeTicks[index] == self.tick:
+            #set the direction directly, it was already validated when recorded
+            self.engine.direction = self.changeDirections[index]
+            self._nextChange = index + 1
+        self.tick += 1
+        event = self.engine.step()
+        if self.tick % self.snapshotInterval == 0 and self.tick not in self.snapshots:
+            self.snapshots[self.tick] = self.engine.snapshot()
+        return event
+
+    def seek(self, tick) -> None:
+        """
+            This method moves the playback to the given tick by restoring
+            the closest earlier snapshot and replaying from there.
+        """
+        tick = max(0, min(tick, self.ticks))
+        start = tick - tick % self.snapshotInterval
+        while start not in self.snapshots:
+            start -= self.snapshotInterval
+        if start > self.tick or tick < self.tick:
+            self.engine.restore(self.snapshots[start])
+            self.tick = start
+            self._nextChange = bisect.bisect_left(self.changeTicks, start)
+        while self.tick < tick:
+            self.step()
+
+    def play(self, speed=1.0, onTick=None) -> None:
+        """
+            This method plays the rest of the recording. speed=1 is real
+            time, larger values fast-forward and None plays as fast as
+            possible. onTick(event) is called after every tick.
+        """
+        SPEED = 0.15     #speed of snake updates (sec), as in the frontends
+        while self.tick < self.ticks:
+            event = self.step()
+            if onTick is not None:
+                onTick(event)
+            if speed is not None:
+                time.sleep(SPEED*self.engine._time_factor/speed)
+
+
+if __name__ == "__main__":
+    player = ReplayPlayer.load(sys.argv[1])
+    start = time.perf_counter()
+    player.play(speed=None)
+    elapsed = time.perf_counter() - start
+    print(f"seed {player.seed}, {player.ticks} ticks, "
+          f"{len(player.changeTicks)} direction changes, score {player.engine.score}")
+    print(f"replayed in {elapsed*1000:.1f} ms")
@@ -0,0 +1,92 @@
+# Group#: G5
+# Student Names: Weifeng Ke & Peter Kim
+
+"""
+    This module supports boards that are larger than the window, up to
+    millions of cells. The engine keeps the snake in chunks of the board
+    (snake_engine.ChunkedOccupancy) and a camera follows the head, so the
+    frontends only draw the segments inside the window. The memory and
+    the work per frame follow the length of the snake and the size of the
+    window, not the size of the board.
+"""
+
+from snake_engine import GameConfig, CHUNK_CELLS
+
+
+def worldConfig(cols, rows, snakeIconWidth=15, preyIconWidth=15, movement=15) -> GameConfig:
+    """
+        This function returns the configuration of a board of cols x rows
+        cells, on the same grid as the default board, with the starting
+        snake moved to its middle. It raises ValueError if the board is
+        too small for the starting snake.
+    """
+    defaults = GameConfig()
+    width = 5 + movement*(cols - 1)
+    height = 10 + movement*(rows - 1)
+    headX, headY = defaults.startCoordinates[-1]
+    #shift by whole cells so the snake stays on the grid
+    dx = movement*((width//2 - headX)//movement)
+    dy = movement*((height//2 - headY)//movement)
+    start = [(x + dx, y + dy) for x, y in defaults.startCoordinates]
+    #the starting snake has to be inside the walls and the prey needs room
+    if (any(not (0 <= x <= width and 0 <= y <= height) for x, y in start)
+            or min(width, height) < 2*defaults.threshold):
+        raise ValueError(f"a {cols}x{rows} board is too small for the starting snake")
+    return GameConfig(width, height, snakeIconWidth, preyIconWidth, movement,
+                      startCoordinates=start, startDirection=defaults.startDirection,
+                      chunkCells=CHUNK_CELLS)
+
+
+class Camera():
+    '''
+        This class keeps a window of width x height pixels on a large
+        board. It only moves when the head gets closer than a quarter of
+        the window to an edge of it, and then just far enough to keep the
+        head there, and it does not show more than an icon beyond the walls.
+    '''
+    def __init__(self, width, height, config) -> None:
+        self.width = width
+        self.height = height
+        self.config = config
+        self.left = None
+        self.top = None
+
+    @staticmethod
+    def followAxis(position, head, size, boardSize, border) -> int:
+        """
+            This method returns the new position of the camera along one axis.
+        """
+        margin = size//4
+        if position is None:
+            position = head - size//2
+        elif head < position + margin:
+            position = head - margin
+        elif head > position + size - margin:
+            position = head - size + margin
+        #keep the walls at the edges of the window when the board is reached
+        return int(max(-border, min(position, boardSize + border - size)))
+
+    def follow(self, head) -> None:
+        """
+            This method moves the camera after the head.
+        """
+        config = self.config
+        border = config.snakeIconWidth
+        self.left = self.followAxis(self.left, head[0], self.width, config.windowWidth, border)
+        self.top = self.followAxis(self.top, head[1], self.height, config.windowHeight, border)
+
+    def view(self, engine) -> tuple:
+        """
+            This method follows the head and returns (segments, prey) in
+            window coordinates: the snake segments inside the window, in no
+            particular order, and the prey rectangle.
+        """
+        self.follow(engine.snakeCoordinates[-1])
+        left, top = self.left, self.top
+        #a segment just outside the window may still show half of itself
+        half = engine.config.snakeIconWidth/2
+        points = engine.occupied.inArea(left - half, top - half,
+                                        left + self.width + half, top + self.height + half)
+        segments = [(x - left, y - top) for x, y in points]
+        x1, y1, x2, y2 = engine.prey_position
+        return segments, (x1 - left, y1 - top, x2 - left, y2 - top)